@@ -10,52 +10,8 @@ from libqtile import bar, layout, qtile, widget, hook
 from libqtile.config import Click, Drag, Group, Key, KeyChord, Match, Screen
 from libqtile.lazy import lazy
 from libqtile.utils import guess_terminal
-from libqtile.widget import base
-
-# --- Custom Bluetooth Widget ---
-class BluetoothCtlWidget(base.ThreadPoolText):
-    """
-    A custom widget to control Bluetooth power and open bluetoothctl.
-    """
-    def __init__(self, **config):
-        base.ThreadPoolText.__init__(self, "", **config)
-        self.update_interval = 5
-        self.add_callbacks({
-            'Button1': self.toggle_power,
-            'Button3': self.open_bluetoothctl,
-        })
-
-    def _get_power_status(self):
-        """Gets the current Bluetooth power status."""
-        try:
-            output = subprocess.check_output(['bluetoothctl', 'show'], text=True)
-            if 'Powered: yes' in output:
-                return "On"
-            else:
-                return "Off"
-        except (subprocess.CalledProcessError, FileNotFoundError):
-            return "N/A"
-
-    def poll(self):
-        """Polls for the Bluetooth status and updates the widget text."""
-        status = self._get_power_status()
-        return f"BT: {status}"
-
-    def toggle_power(self):
-        """Toggles Bluetooth power on or off."""
-        status = self._get_power_status()
-        if status == "On":
-            qtile.cmd_spawn('bluetoothctl power off')
-            qtile.cmd_spawn('notify-send "Bluetooth" "Bluetooth turned OFF."')
-        elif status == "Off":
-            qtile.cmd_spawn('bluetoothctl power on')
-            qtile.cmd_spawn('notify-send "Bluetooth" "Bluetooth turned ON."')
-        self.update(self.poll())
-
-    def open_bluetoothctl(self):
-        """Opens an interactive bluetoothctl session in the terminal."""
-        qtile.cmd_spawn(f"{terminal} -e bluetoothctl")
 
+import custom_widgets  # shared with laptop-config.py; imports widgets on first use
 
 # --- Variables ---
 mod = "mod4"  # Sets Super/Windows key as the primary modifier
@@ -303,7 +259,7 @@ screens = [
                     "[g]",
                     mouse_callbacks={
                         'Button1': lazy.spawn('xdg-open https://gemini.google.com/app'),
-                        'Button3': lazy.spawn('https://www.google.com/')
+                        'Button3': lazy.spawn('xdg-open https://www.google.com/')
                     },
                     foreground=color_white,
                     desc="Clickable links for Gemini and Google"
@@ -327,7 +283,8 @@ screens = [
                     desc="Click to open Wi-Fi TUI (nm-tui)"
                 ),
                 # --- Bluetooth Widget ---
-                BluetoothCtlWidget(
+                custom_widgets.BluetoothCtlWidget(
+                    terminal=terminal,
                     foreground=color_red, # MODIFIED: Changed to red
                     desc="Bluetooth control widget"
                 ),
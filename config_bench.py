@@ -0,0 +1,636 @@
+# Benchmarks for laptop-config.py. Each one runs inside a live qtile, best on a
+# throwaway X server, logs its report, writes it to ~/.cache/qtile/<name>-bench.json
+# and shuts qtile down. The config imports this module only when one of the
+# QTILE_*_BENCH variables below is set (see the last hook in the config), so
+# a normal session never loads it. QTILE_SOAK_BENCH is soak-test's: it only
+# speeds up the polling widgets and leaves qtile running.
+#
+#   QTILE_LAYOUT_BENCH=10,50,200    relayout cost per layout and window count
+#   QTILE_FOCUS_BENCH=12            pointer sweeps, follow_mouse_focus vs dwell
+#   QTILE_SWITCHER_BENCH=300        window switcher listing and open latency
+#   QTILE_BAR_BENCH=3600            bar repaint CPU per simulated hour
+#   QTILE_PLACEMENT_BENCH=100,1000  placement rule matching, indexed vs linear
+#   QTILE_RELOAD_BENCH=5            partial hot reloads against a full reload
+#   QTILE_SCREENSHOT_BENCH=1        full-screen capture to clipboard
+#   QTILE_SOAK_BENCH=240            polling widgets 240x faster, the clock in real time
+#
+# e.g. QTILE_LAYOUT_BENCH=10,50,200 xvfb-run -a qtile start -c laptop-config.py
+
+import asyncio
+import json
+import logging
+import math
+import os
+import re
+import statistics
+import subprocess
+import threading
+import time
+from collections import Counter
+from contextlib import ExitStack, contextmanager
+
+from libqtile import bar
+
+from services import focus, hotreload, launcher, placement, power, screenshot
+
+logger = logging.getLogger(__name__)
+
+CACHE_DIR = os.path.expanduser('~/.cache/qtile')
+
+cfg = None  # the config module, set by run()
+
+# ---------------------------------------------------------------------------
+# Layout scaling
+# Opens N dummy X clients in the current group and times relayouts in every
+# layout, with gaps on and off. The focus and switcher benchmarks reuse its
+# client setup and report.
+# ---------------------------------------------------------------------------
+LAYOUT_BENCH_REPORT = os.path.join(CACHE_DIR, 'layout-bench.json')
+LAYOUT_BENCH_OPS = (
+    "grow_left", "grow_right", "grow_up", "grow_down",
+    "shuffle_left", "shuffle_right", "shuffle_up", "shuffle_down",
+    "normalize",
+)
+
+class LayoutBenchmark:
+    REPORT = LAYOUT_BENCH_REPORT
+
+    def __init__(self, qtile_instance, counts=(10, 50, 200), repeats=5, on_done=None):
+        self.qtile = qtile_instance
+        self.counts = sorted(counts)
+        self.repeats = repeats
+        self.on_done = on_done
+        self.group = qtile_instance.current_group
+        self.results = {}
+        self._conn = None
+        self._pending = list(self.counts)
+        self._deadline = 0
+
+    def start(self):
+        if self.qtile.core.name != "x11":
+            logger.warning("layout benchmark needs the x11 backend")
+            if self.on_done:
+                self.on_done()
+            return
+        import xcffib
+        self._conn = xcffib.connect(display=os.environ.get("DISPLAY"))
+        self._next_count()
+
+    # -- dummy clients -----------------------------------------------------
+    def _open_clients(self, n):
+        from xcffib.xproto import WindowClass
+        root = self._conn.get_setup().roots[self._conn.pref_screen]
+        for _ in range(n):
+            wid = self._conn.generate_id()
+            self._conn.core.CreateWindow(
+                root.root_depth, wid, root.root, 0, 0, 100, 100, 0,
+                WindowClass.InputOutput, root.root_visual, 0, [],
+            )
+            self._conn.core.MapWindow(wid)
+        self._conn.flush()
+
+    def _tiled(self):
+        return [w for w in self.group.windows if not w.floating]
+
+    def _next_count(self):
+        if not self._pending:
+            self._finish()
+            return
+        target = self._pending[0]
+        self._open_clients(max(0, target - len(self._tiled())))
+        self._deadline = time.monotonic() + 30
+        self._wait_for(target)
+
+    def _wait_for(self, target):
+        if len(self._tiled()) >= target:
+            self._pending.pop(0)
+            self._measure(target)
+            self._next_count()
+        elif time.monotonic() > self._deadline:
+            logger.error(f"layout benchmark: only {len(self._tiled())}/{target} clients mapped, giving up")
+            self._finish()
+        else:
+            self.qtile.call_later(0.1, self._wait_for, target)
+
+    # -- measurement -------------------------------------------------------
+    def _time(self, fn):
+        samples = []
+        for _ in range(self.repeats):
+            start = time.perf_counter()
+            fn()
+            self.qtile.core.flush()
+            samples.append((time.perf_counter() - start) * 1000)
+        return statistics.median(samples)
+
+    def _set_margin(self, margin):
+        for lyt in self.group.layouts:
+            if hasattr(lyt, 'margin'):
+                lyt.margin = margin
+
+    def _measure(self, n):
+        original_layout = self.group.current_layout
+        for idx, lyt in enumerate(self.group.layouts):
+            self.group.use_layout(idx)
+            for gaps, margin in (("gaps", cfg.DEFAULT_GAP_SIZE), ("nogaps", 0)):
+                self._set_margin(margin)
+                self.group.layout_all()
+                ops = self.results.setdefault(lyt.name, {}).setdefault(gaps, {})
+
+                def add_remove():
+                    win = self._tiled()[-1]
+                    self.group.remove(win)
+                    self.group.add(win)
+                ops.setdefault("add_remove", {})[n] = self._time(add_remove)
+
+                for op in LAYOUT_BENCH_OPS:
+                    if hasattr(lyt, op):
+                        ops.setdefault(op, {})[n] = self._time(getattr(lyt, op))
+
+                def gap_toggle():
+                    self._set_margin(0 if margin else cfg.DEFAULT_GAP_SIZE)
+                    self.group.layout_all()
+                    self._set_margin(margin)
+                    self.group.layout_all()
+                ops.setdefault("gap_toggle", {})[n] = self._time(gap_toggle) / 2
+
+        self._set_margin(cfg.DEFAULT_GAP_SIZE if cfg.gaps_enabled else 0)
+        self.group.use_layout(original_layout)
+
+    # -- report ------------------------------------------------------------
+    def report(self):
+        lines = [f"layout benchmark (median ms per relayout, n={self.counts})"]
+        for lyt_name, by_gaps in self.results.items():
+            for gaps, ops in by_gaps.items():
+                for op, by_n in ops.items():
+                    timings = "  ".join(f"{n}:{ms:7.3f}" for n, ms in sorted(by_n.items()))
+                    # growth exponent k in t ~ n^k between smallest and largest n
+                    lo, hi = min(by_n), max(by_n)
+                    growth = ""
+                    if hi > lo and by_n[lo] > 0:
+                        k = math.log(by_n[hi] / by_n[lo]) / math.log(hi / lo)
+                        growth = f"  ~n^{k:.2f}"
+                    lines.append(f"  {lyt_name:<8} {gaps:<6} {op:<14} {timings}{growth}")
+        return "\n".join(lines)
+
+    def _finish(self):
+        if self._conn is not None:
+            # disconnecting destroys every dummy client we created
+            self._conn.disconnect()
+            self._conn = None
+        logger.info(self.report())
+        os.makedirs(os.path.dirname(self.REPORT), exist_ok=True)
+        with open(self.REPORT, 'w') as f:
+            json.dump(self.report_data(), f, indent=2)
+        if self.on_done:
+            self.on_done()
+
+    def report_data(self):
+        return {"counts": self.counts, "repeats": self.repeats, "results": self.results}
+
+# ---------------------------------------------------------------------------
+# Focus follows mouse
+# Sweeps the pointer across N windows in the current group with both
+# behaviours (see "Focus follows mouse" in the config) and counts focus
+# changes, border and bar repaints and relayouts per sweep.
+# ---------------------------------------------------------------------------
+FOCUS_BENCH_REPORT = os.path.join(CACHE_DIR, 'focus-bench.json')
+FOCUS_BENCH_SPEED = 3000  # px/s, a quick flick across the screen
+FOCUS_BENCH_STEP = 0.005  # s between pointer warps
+
+class FocusBenchmark(LayoutBenchmark):
+    REPORT = FOCUS_BENCH_REPORT
+
+    def __init__(self, qtile_instance, count=12, sweeps=6, on_done=None):
+        LayoutBenchmark.__init__(self, qtile_instance, counts=(count,), on_done=on_done)
+        self.count = count
+        self.sweeps = sweeps
+        self.modes = {"follow_mouse_focus": 0, "dwell": focus.FOCUS_DWELL or 0.15}
+        self._modes = list(self.modes.items())
+        self._saved = (qtile_instance.config.follow_mouse_focus, cfg.mouse_focus.dwell)
+        self._counts = {}
+        self._focus = {}
+
+    def _measure(self, n):
+        pass  # the sweeps below need the event loop, see _next_count
+
+    def _next_count(self):
+        if self._pending:
+            return LayoutBenchmark._next_count(self)
+        self._next_mode()
+
+    def _next_mode(self):
+        if not self._modes:
+            self.qtile.config.follow_mouse_focus, cfg.mouse_focus.dwell = self._saved
+            self._finish()
+            return
+        mode, dwell = self._modes.pop(0)
+        cfg.mouse_focus.cancel()
+        cfg.mouse_focus.dwell = dwell
+        self.qtile.config.follow_mouse_focus = not dwell
+        counts = self._counts[mode] = {"borders": Counter(), "bar": Counter(), "relayouts": Counter()}
+        stack = ExitStack()
+        stack.enter_context(counting_calls(self._tiled(), "paint_borders", counts["borders"]))
+        stack.enter_context(counting_calls([self.group], "layout_all", counts["relayouts"]))
+        for screen in self.qtile.screens:
+            for gap in (screen.top, screen.bottom, screen.left, screen.right):
+                if isinstance(gap, bar.Bar):
+                    stack.enter_context(counting_calls(gap.widgets, "draw", counts["bar"]))
+        start_events = cfg.mouse_focus.focus_events
+        root = self._conn.get_setup().roots[self._conn.pref_screen].root
+        screen = self.group.screen
+        y = screen.y + screen.height // 2
+        step = max(1, int(FOCUS_BENCH_SPEED * FOCUS_BENCH_STEP))
+        path = []
+        for sweep in range(self.sweeps):
+            xs = range(screen.x + 1, screen.x + screen.width - 1, step)
+            path.append(list(xs if sweep % 2 == 0 else reversed(xs)))
+
+        def done():
+            stack.close()
+            self._focus[mode] = cfg.mouse_focus.focus_events - start_events
+            self._next_mode()
+        self._sweep(root, path, y, done)
+
+    def _sweep(self, root, path, y, done):
+        if not path:
+            done()
+            return
+        xs = path[0]
+        if not xs:
+            path.pop(0)
+            # settle: let a pending dwell on the last window resolve
+            self.qtile.call_later(max(cfg.mouse_focus.dwell, focus.FOCUS_POLL) * 3, self._sweep, root, path, y, done)
+            return
+        self._conn.core.WarpPointer(0, root, 0, 0, 0, 0, xs.pop(0), y)
+        self._conn.flush()
+        self.qtile.call_later(FOCUS_BENCH_STEP, self._sweep, root, path, y, done)
+
+    def report(self):
+        lines = [f"focus benchmark ({self.count} windows, {self.sweeps} sweeps at {FOCUS_BENCH_SPEED} px/s, per sweep)"]
+        self.results = {}
+        for mode, counts in self._counts.items():
+            row = self.results[mode] = {
+                "focus_changes": self._focus.get(mode, 0) / self.sweeps,
+                "border_repaints": sum(counts["borders"].values()) / self.sweeps,
+                "bar_repaints": sum(counts["bar"].values()) / self.sweeps,
+                "relayouts": sum(counts["relayouts"].values()) / self.sweeps,
+            }
+            lines.append(f"  {mode:<18} " + "  ".join(f"{k} {v:.1f}" for k, v in row.items()))
+        return "\n".join(lines)
+
+    def report_data(self):
+        return {"windows": self.count, "sweeps": self.sweeps, "speed": FOCUS_BENCH_SPEED,
+                "dwell": self.modes["dwell"], "results": self.results}
+
+# ---------------------------------------------------------------------------
+# Window switcher
+# Opens N windows spread over the nine groups and times listing them from
+# window_history (what the switcher does on open) against asking X for every
+# window's name, class and desktop (what `rofi -show window` does on open).
+# With rofi installed, key-to-map latency of `rofi -show window` and of the
+# dmenu switcher is measured too.
+# ---------------------------------------------------------------------------
+SWITCHER_BENCH_REPORT = os.path.join(CACHE_DIR, 'switcher-bench.json')
+SWITCHER_BENCH_KINDS = ("show", "dmenu")
+
+class SwitcherBenchmark(LayoutBenchmark):
+    REPORT = SWITCHER_BENCH_REPORT
+
+    def __init__(self, qtile_instance, count=300, repeats=5, on_done=None):
+        LayoutBenchmark.__init__(self, qtile_instance, counts=(count,), repeats=repeats, on_done=on_done)
+        self.count = count
+        self._opens = []
+
+    def _query_x(self):
+        from xcffib import xproto
+        conn = self._conn
+        root = conn.get_setup().roots[conn.pref_screen].root
+        clients = conn.core.GetProperty(False, root, self._atoms["_NET_CLIENT_LIST"], xproto.Atom.WINDOW, 0, 1 << 16).reply()
+        cookies = [conn.core.GetProperty(False, wid, self._atoms[name], xproto.GetPropertyType.Any, 0, 1024)
+                   for wid in clients.value.to_atoms()
+                   for name in ("_NET_WM_NAME", "WM_CLASS", "_NET_WM_DESKTOP")]
+        return [cookie.reply() for cookie in cookies]
+
+    def _measure(self, n):
+        import random
+        groups = [self.qtile.groups_map[name] for name in "123456789" if name in self.qtile.groups_map]
+        windows = list(self._tiled())
+        for i, win in enumerate(windows):
+            win.togroup(groups[i % len(groups)].name)
+        for win in random.Random(0).sample(windows, len(windows)):
+            cfg.window_history.touch(win)
+        self._atoms = {name: self._conn.core.InternAtom(False, len(name), name).reply().atom
+                       for name in ("_NET_CLIENT_LIST", "_NET_WM_NAME", "WM_CLASS", "_NET_WM_DESKTOP")}
+        current = self.qtile.current_window
+        self.results["windows"] = len(cfg.window_history.windows())
+        self.results["history_ms"] = self._time(
+            lambda: [f"{w.group.name}: {w.name}" for w in cfg.window_history.windows(current)])
+        self.results["x_query_ms"] = self._time(self._query_x)
+
+    def _next_count(self):
+        if self._pending:
+            return LayoutBenchmark._next_count(self)
+        if cfg.tools.has('rofi'):
+            self._opens = [kind for kind in SWITCHER_BENCH_KINDS for _ in range(self.repeats)]
+        self._next_open()
+
+    def _next_open(self):
+        if not self._opens:
+            self._finish()
+            return
+        kind = self._opens.pop(0)
+        label = f"switcher-bench:{kind}"
+        before = len(launcher.timings.get(label, []))
+        launcher.time_first_map(label)
+        if kind == "show":
+            self.qtile.cmd_spawn("rofi -show window")
+        else:
+            cfg.launch_windows(self.qtile)
+        self._await_map(label, before, time.monotonic() + 6)
+
+    def _await_map(self, label, before, deadline):
+        if len(launcher.timings.get(label, [])) > before or time.monotonic() > deadline:
+            subprocess.run(["pkill", "-x", "rofi"], check=False)
+            self.qtile.call_later(0.3, self._next_open)  # let rofi exit and drop its grabs
+        else:
+            self.qtile.call_later(0.02, self._await_map, label, before, deadline)
+
+    def report(self):
+        self.results["open_ms"] = {kind: statistics.median(launcher.timings[f"switcher-bench:{kind}"])
+                                   for kind in SWITCHER_BENCH_KINDS if launcher.timings.get(f"switcher-bench:{kind}")}
+        lines = [f"switcher benchmark ({self.results.get('windows', 0)} windows, median ms)",
+                 f"  list from history {self.results.get('history_ms', 0):8.3f}",
+                 f"  query X           {self.results.get('x_query_ms', 0):8.3f}"]
+        lines += [f"  open {kind:<12} {ms:8.1f}" for kind, ms in self.results["open_ms"].items()]
+        return "\n".join(lines)
+
+# ---------------------------------------------------------------------------
+# Bar repaint
+# CPU cost and widget repaints per simulated hour of the clock ticking, with
+# the clock format in seconds and in minutes, for the stock widget.Clock
+# drawing against the tabular clock. Both go through the stock bar: a text
+# widget that keeps its width repaints itself, any other change repaints the
+# whole bar.
+# ---------------------------------------------------------------------------
+BAR_BENCH_REPORT = os.path.join(CACHE_DIR, 'bar-bench.json')
+BAR_BENCH_MODES = {
+    "clock": {"tabular": False},
+    "tabular": {"tabular": True},
+}
+
+@contextmanager
+def counting_calls(objects, method, counts):
+    """Counts calls of obj.<method>() per object into counts (a Counter)
+    while active, by shadowing the method on each instance."""
+    own = {}
+    for obj in objects:
+        own[obj] = obj.__dict__.get(method)
+        def counted(*args, obj=obj, call=getattr(obj, method), **kwargs):
+            counts[obj] += 1
+            return call(*args, **kwargs)
+        setattr(obj, method, counted)
+    try:
+        yield counts
+    finally:
+        for obj, call in own.items():
+            if call is None:
+                delattr(obj, method)
+            else:
+                setattr(obj, method, call)
+
+async def _bar_bench_hour(clock, fmt, seconds, draws):
+    step = 1 if "%S" in fmt else 60
+    start = time.time() // 3600 * 3600
+    clock.format = fmt
+    draws.clear()
+    cpu = 0.0
+    for t in range(0, seconds, step):
+        text = time.strftime(fmt, time.localtime(start + t))
+        before = time.thread_time()
+        clock.update(text)
+        await asyncio.sleep(0)  # lets a queued bar.draw() run
+        cpu += time.thread_time() - before
+    scale = 3600 / seconds
+    return {
+        "cpu_ms_per_hour": cpu * 1000 * scale,
+        "repaints_per_hour": round(sum(draws.values()) * scale),
+        "clock_repaints_per_hour": round(draws[clock] * scale),
+    }
+
+async def run_bar_benchmark(qtile_instance, seconds=3600):
+    clock = qtile_instance.widgets_map.get("clock")
+    if not hasattr(clock, "tabular"):
+        logger.warning("bar benchmark: no TabularClock named 'clock'")
+        return None
+    bar_ = clock.bar
+    saved = (clock.tabular, clock.format)
+    draws = Counter()
+    results = {}
+    try:
+        with counting_calls(bar_.widgets, "draw", draws):
+            for mode, settings in BAR_BENCH_MODES.items():
+                clock.tabular = settings["tabular"]
+                clock.text = clock.text  # resync the widget.Clock layout when switching paths
+                bar_.draw()
+                await asyncio.sleep(0)
+                results[mode] = {
+                    "seconds": await _bar_bench_hour(clock, power.CLOCK_FORMAT_SECONDS, seconds, draws),
+                    "minutes": await _bar_bench_hour(clock, power.CLOCK_FORMAT_MINUTES, seconds, draws),
+                }
+    finally:
+        clock.tabular, clock.format = saved
+        clock.text = clock.text
+        bar_.draw()
+    logger.info("bar benchmark (CPU ms / repaints per hour): " + "; ".join(
+        f"{mode} " + ", ".join(f"{fmt} {r['cpu_ms_per_hour']:.0f}/{r['repaints_per_hour']}" for fmt, r in by_fmt.items())
+        for mode, by_fmt in results.items()))
+    logger.info(f"bar benchmark: clock layout cache {clock.layout_hits} hits, {clock.layout_misses} misses")
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    with open(BAR_BENCH_REPORT, 'w') as f:
+        json.dump({"seconds": seconds, "widgets": len(bar_.widgets), "results": results}, f, indent=2)
+    return results
+
+# ---------------------------------------------------------------------------
+# App placement
+# Matching cost of large synthetic rule tables, PlacementRules against a
+# linear scan.
+# ---------------------------------------------------------------------------
+PLACEMENT_BENCH_REPORT = os.path.join(CACHE_DIR, 'placement-bench.json')
+
+def _linear_match(rules, wm_class, title):
+    # what a plain list of Match-style checks does: every rule, in order
+    names = [n.lower() for n in wm_class or ()]
+    for rule, cls, title_re in rules:
+        if cls is not None and cls not in names:
+            continue
+        if title_re is not None and not (title and title_re.search(title)):
+            continue
+        return rule
+    return None
+
+def run_placement_benchmark(sizes=(100, 1000, 10000), lookups=2000):
+    import random
+    rnd = random.Random(0)
+    results = {}
+    for n in sizes:
+        rules = []
+        for i in range(n):
+            if i % 25 == 0:
+                rules.append({"title": rf"^Window {i}$", "float": True})
+            elif i % 10 == 0:
+                rules.append({"wm_class": f"app{i}", "title": rf"doc{i}\b", "group": str(i % 9 + 1)})
+            else:
+                rules.append({"wm_class": f"app{i}", "group": str(i % 9 + 1)})
+        start = time.perf_counter()
+        compiled = placement.PlacementRules(rules)
+        compile_ms = (time.perf_counter() - start) * 1000
+        linear = [(r, r.get("wm_class"), re.compile(r["title"]) if r.get("title") else None) for r in rules]
+        # about half the windows match nothing, like most real windows
+        windows = [([f"inst{j}", f"app{j}"], f"doc{j} - Window {j}") for j in (rnd.randrange(2 * n) for _ in range(lookups))]
+        timings = {}
+        answers = {}
+        for name, match in (("indexed", compiled.match), ("linear", lambda c, t: _linear_match(linear, c, t))):
+            start = time.perf_counter()
+            answers[name] = [match(cls, title) for cls, title in windows]
+            timings[name] = (time.perf_counter() - start) * 1e6 / lookups
+        mismatches = sum(a != b for a, b in zip(answers["indexed"], answers["linear"]))
+        results[n] = {"compile_ms": compile_ms, "indexed_us": timings["indexed"],
+                      "linear_us": timings["linear"], "mismatches": mismatches}
+    logger.info("placement benchmark (us per window, indexed / linear): " + ", ".join(
+        f"{n} rules {r['indexed_us']:.1f} / {r['linear_us']:.1f} (compile {r['compile_ms']:.1f} ms"
+        + (f", {r['mismatches']} MISMATCHES" if r['mismatches'] else "") + ")" for n, r in results.items()))
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    with open(PLACEMENT_BENCH_REPORT, 'w') as f:
+        json.dump({"lookups": lookups, "results": results}, f, indent=2)
+    return results
+
+# ---------------------------------------------------------------------------
+# Config hot reload
+# Each kind of partial reload against a full reload_config().
+# ---------------------------------------------------------------------------
+RELOAD_BENCH_REPORT = os.path.join(CACHE_DIR, 'reload-bench.json')
+
+def run_reload_benchmark(qtile_instance, repeats=5):
+    kinds = {
+        "keys": {"keys"},
+        "layouts": {"layouts"},
+        "bar": {"bar"},
+        "colors": {"layouts", "bar"},
+    }
+    results = {}
+    for kind, actions in kinds.items():
+        samples = []
+        for _ in range(repeats):
+            start = time.perf_counter()
+            if not (hotreload.load_config_keep_hooks(qtile_instance)
+                    and hotreload.apply_actions(qtile_instance, actions, cfg.layout_theme)):
+                logger.warning(f"reload benchmark: {kind} needs a full reload on this qtile, skipped")
+                break
+            samples.append((time.perf_counter() - start) * 1000)
+        if not samples:
+            continue
+        results[kind] = {"median_ms": statistics.median(samples), "min_ms": min(samples)}
+    samples = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        qtile_instance.reload_config()
+        samples.append((time.perf_counter() - start) * 1000)
+    results["full"] = {"median_ms": statistics.median(samples), "min_ms": min(samples)}
+    full = results["full"]["median_ms"]
+    logger.info("reload benchmark (median ms): " + ", ".join(
+        f"{kind} {r['median_ms']:.1f} ({r['median_ms'] / full:.0%} of full)" for kind, r in results.items()))
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    with open(RELOAD_BENCH_REPORT, 'w') as f:
+        json.dump({"repeats": repeats, "results": results}, f, indent=2)
+    return results
+
+# ---------------------------------------------------------------------------
+# Screenshots
+# ---------------------------------------------------------------------------
+SCREENSHOT_BENCH_REPORT = os.path.join(CACHE_DIR, 'screenshot-bench.json')
+
+def run_screenshot_benchmark(repeats=5):
+    """Full-root capture-to-clipboard timings (run Xvfb at 3840x2160 for 4K)."""
+    import xcffib
+    conn = xcffib.connect(display=os.environ.get("DISPLAY"))
+    screen = conn.get_setup().roots[conn.pref_screen]
+    width, height = screen.width_in_pixels, screen.height_in_pixels
+    owner = screenshot.get_clipboard_owner()
+    results = {"width": width, "height": height}
+    try:
+        for label, use_shm in (("shm", True), ("core", False)):
+            samples = []
+            for _ in range(repeats):
+                start = time.perf_counter()
+                png = screenshot.capture_png(conn, screen.root, 0, 0, width, height, use_shm=use_shm)
+                owner.set("image/png", png)
+                samples.append((time.perf_counter() - start) * 1000)
+            results[label] = {"median_ms": statistics.median(samples), "min_ms": min(samples), "png_bytes": len(png)}
+            logger.info(f"screenshot benchmark {width}x{height} {label}: median {results[label]['median_ms']:.1f} ms")
+    finally:
+        conn.disconnect()
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    with open(SCREENSHOT_BENCH_REPORT, 'w') as f:
+        json.dump(results, f, indent=2)
+    return results
+
+# ---------------------------------------------------------------------------
+# Entry point
+# ---------------------------------------------------------------------------
+def _ints(value):
+    return [int(n) for n in value.split(',') if n.strip()]
+
+# ---------------------------------------------------------------------------
+# Soak speedup
+# soak-test gets through a simulated day in minutes by polling every widget
+# but the clock this many times faster; the power policy keeps scaling for
+# battery and pausing while blanked on top of that.
+# ---------------------------------------------------------------------------
+def speed_up_polling(speedup):
+    policy = cfg.power_policy
+    configured = type(policy).configured_interval
+    clock_formats = (power.CLOCK_FORMAT_SECONDS, power.CLOCK_FORMAT_MINUTES)
+    def sped_up(w):
+        interval = configured(w)
+        return interval if getattr(w, 'format', None) in clock_formats else interval / speedup
+    policy.configured_interval = sped_up
+    policy.apply()
+    logger.info(f"soak: polling widgets {speedup:g}x faster")
+
+def run(qtile, config):
+    """Starts the benchmark the environment asks for, if any; called by the
+    config at startup_complete. qtile shuts down when it is done, except
+    for the soak speedup."""
+    global cfg
+    cfg = config
+    env = os.environ.get
+    if env('QTILE_LAYOUT_BENCH'):
+        LayoutBenchmark(qtile, counts=_ints(env('QTILE_LAYOUT_BENCH')), on_done=qtile.cmd_shutdown).start()
+    elif env('QTILE_FOCUS_BENCH'):
+        FocusBenchmark(qtile, count=int(env('QTILE_FOCUS_BENCH')), on_done=qtile.cmd_shutdown).start()
+    elif env('QTILE_SWITCHER_BENCH'):
+        SwitcherBenchmark(qtile, count=int(env('QTILE_SWITCHER_BENCH')), on_done=qtile.cmd_shutdown).start()
+    elif env('QTILE_PLACEMENT_BENCH'):
+        run_placement_benchmark(_ints(env('QTILE_PLACEMENT_BENCH')))
+        qtile.cmd_shutdown()
+    elif env('QTILE_RELOAD_BENCH'):
+        # after the loop has settled, so the first sample isn't paying for startup
+        repeats = int(env('QTILE_RELOAD_BENCH'))
+        qtile.call_later(1, lambda: (run_reload_benchmark(qtile, repeats), qtile.cmd_shutdown()))
+    elif env('QTILE_BAR_BENCH'):
+        seconds = int(env('QTILE_BAR_BENCH'))
+        async def bar_bench():
+            await run_bar_benchmark(qtile, seconds)
+            qtile.cmd_shutdown()
+        qtile.call_later(1, lambda: asyncio.ensure_future(bar_bench()))
+    elif env('QTILE_SCREENSHOT_BENCH'):
+        # e.g. xvfb-run -a -s "-screen 0 3840x2160x24" for 4K
+        def work():
+            try:
+                run_screenshot_benchmark()
+            except Exception:
+                logger.exception("screenshot benchmark failed")
+            qtile.call_soon_threadsafe(qtile.cmd_shutdown)
+        threading.Thread(target=work, name="screenshot-bench", daemon=True).start()
+    elif env('QTILE_SOAK_BENCH'):
+        speed_up_polling(float(env('QTILE_SOAK_BENCH')))
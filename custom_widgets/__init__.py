@@ -0,0 +1,17 @@
+# Widgets shared by laptop-config.py and config.py. Nothing is imported until a
+# config touches one of the names below (the same PEP 562 trick
+# libqtile.widget uses), so a bar only pays for the widgets it actually has.
+# Each widget takes its collaborators (notifications, tool checks, the
+# Bluetooth inventory...) as options instead of reaching into a config.
+
+from libqtile.utils import lazify_imports
+
+widgets = {
+    "BluetoothCtlWidget": "bluetooth",
+    "CommandPrompt": "prompt",
+    "IndexedCommandCompleter": "prompt",
+    "InternalKeyboardToggle": "keyboard",
+    "TabularClock": "clock",
+}
+
+__all__, __dir__, __getattr__ = lazify_imports(widgets, __name__)
@@ -0,0 +1,75 @@
+import shlex
+import shutil
+import subprocess
+
+from libqtile import qtile
+from libqtile.widget import base
+
+
+def _notify_send(summary, body):
+    qtile.cmd_spawn(['notify-send', summary, body])
+
+
+# Bluetooth power and connected devices. Text comes from `inventory` (see
+# BluetoothInventory in services/bluez.py) when BlueZ is reachable on D-Bus,
+# else from polling `bluetoothctl show`.
+class BluetoothCtlWidget(base.ThreadPoolText):
+    defaults = [
+        ("terminal", "xterm", "Terminal to run bluetoothctl in on right click"),
+        ("inventory", None, "Object with available/status/adapters/set_powered(), polled instead of bluetoothctl"),
+        ("picker", None, "Called on right click while the inventory is available"),
+        ("notify", None, "notify(summary, body); None runs notify-send"),
+        ("has_tool", shutil.which, "has_tool(name) -> truthy if the program is installed"),
+        ("update_interval", 5, "Seconds between polls"),
+    ]
+
+    def __init__(self, **config):
+        config.setdefault("name", "bluetooth")
+        base.ThreadPoolText.__init__(self, "", **config)
+        self.add_defaults(BluetoothCtlWidget.defaults)
+        self.add_callbacks({'Button1': self.toggle_power, 'Button3': self.open_bluetoothctl})
+
+    def _notify(self, body):
+        (self.notify or _notify_send)("Bluetooth", body)
+
+    def _live(self):
+        return self.inventory is not None and self.inventory.available
+
+    def _get_power_status(self):
+        if not self.has_tool('bluetoothctl'):
+            return "N/A"
+        try:
+            output = subprocess.check_output(['bluetoothctl', 'show'], text=True)
+            return "On" if 'Powered: yes' in output else "Off"
+        except (subprocess.CalledProcessError, FileNotFoundError):
+            return "N/A"
+
+    def poll(self):
+        if self._live():
+            return self.inventory.status
+        return f"BT: {self._get_power_status()}"
+
+    def toggle_power(self):
+        if self._live():
+            powered = any(self.inventory.adapters.values())
+            self.inventory.set_powered(not powered)
+            self._notify(f"Bluetooth turned {'OFF' if powered else 'ON'}.")
+            return
+        status = self._get_power_status()
+        if status == "On":
+            self.qtile.cmd_spawn('bluetoothctl power off')
+            self._notify("Bluetooth turned OFF.")
+        elif status == "Off":
+            self.qtile.cmd_spawn('bluetoothctl power on')
+            self._notify("Bluetooth turned ON.")
+        else:
+            self._notify("bluetoothctl is not installed.")
+        self.update(self.poll())
+
+    def open_bluetoothctl(self):
+        if self._live() and self.picker is not None:
+            self.picker()
+        elif self.has_tool('bluetoothctl'):
+            self.qtile.cmd_spawn(shlex.split(self.terminal) + ['-e', 'bluetoothctl'])
+        else:
+            self._notify("bluetoothctl is not installed.")
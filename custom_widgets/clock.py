@@ -0,0 +1,103 @@
+import re
+from collections import OrderedDict
+
+from libqtile import widget
+
+PIECES = re.compile(r"\d+|\D+")
+
+
+# widget.Clock that draws its text as separate pieces (runs of digits and the
+# text between them), each shaped once and kept in an LRU cache of text
+# layouts; a seconds clock reuses its cached "07" instead of shaping the whole
+# date and time on every tick. Digits are drawn in cells as wide as the
+# widest digit, so the width only changes with the words (weekday, AM/PM) or
+# the format, and a tick repaints the clock alone instead of the whole bar.
+class TabularClock(widget.Clock):
+    defaults = [
+        ("tabular", True, "Draw from cached fixed-width pieces; False draws like widget.Clock"),
+        ("layout_cache_size", 256, "Most text layouts kept, one per distinct piece"),
+    ]
+
+    def __init__(self, **config):
+        widget.Clock.__init__(self, **config)
+        self.add_defaults(TabularClock.defaults)
+        self._pieces = OrderedDict()  # piece -> (layout, cell width, text width)
+        self._digit_width = 0
+        self._line_height = 0
+        self.layout_hits = 0
+        self.layout_misses = 0
+
+    def _configure(self, qtile, bar):
+        widget.Clock._configure(self, qtile, bar)
+        self._digit_width, self._line_height = self.drawer.max_layout_size(
+            list("0123456789"), self.font, self.fontsize)
+
+    def _use_pieces(self):
+        return (self.layout is not None and self.tabular and self.bar.horizontal
+                and not self.markup and not self.scroll)
+
+    @property
+    def text(self):
+        return self._text
+
+    @text.setter
+    def text(self, value):
+        if self._use_pieces():
+            self._text = value  # shaped piece by piece in draw()
+        else:
+            widget.Clock.text.fset(self, value)
+
+    def _piece(self, piece):
+        cached = self._pieces.get(piece)
+        if cached is not None:
+            self._pieces.move_to_end(piece)
+            self.layout_hits += 1
+            return cached
+        self.layout_misses += 1
+        layout = self.drawer.textlayout(piece, self.foreground, self.font, self.fontsize, self.fontshadow)
+        width = layout.width
+        cell = self._digit_width * len(piece) if piece.isdigit() else width
+        cached = self._pieces[piece] = (layout, cell, width)
+        if len(self._pieces) > self.layout_cache_size:
+            self._pieces.popitem(last=False)[1][0].finalize()
+        return cached
+
+    def calculate_length(self):
+        if not self._use_pieces():
+            return widget.Clock.calculate_length(self)
+        if not self.text:
+            return 0
+        return sum(self._piece(p)[1] for p in PIECES.findall(self.formatted_text)) + self.actual_padding * 2
+
+    def update(self, text):
+        if not self._use_pieces():
+            return widget.Clock.update(self, text)
+        if not self.can_draw() or self.text == text:
+            return
+        old_length = self.length
+        self.text = text or ""
+        if self.length == old_length:
+            self.draw()
+        else:
+            self.bar.draw()
+
+    def draw(self):
+        if not self._use_pieces():
+            return widget.Clock.draw(self)
+        if not self.can_draw():
+            return
+        self.drawer.clear(self.background or self.bar.background)
+        x = self.actual_padding or 0
+        y = int(self.bar.height / 2.0 - self._line_height / 2.0) + 1
+        for piece in PIECES.findall(self.formatted_text):
+            layout, cell, width = self._piece(piece)
+            layout.colour = self.foreground
+            layout.draw(x + (cell - width) // 2, y)
+            x += cell
+        self.drawer.draw(offsetx=self.offsetx, offsety=self.offsety, width=self.width, height=self.height)
+
+    def finalize(self):
+        for layout, _, _ in self._pieces.values():
+            layout.finalize()
+        self._pieces.clear()
+        widget.Clock.finalize(self)
@@ -0,0 +1,131 @@
+import io
+import logging
+import os
+import shutil
+import struct
+import subprocess
+import threading
+
+from libqtile.widget import base
+
+logger = logging.getLogger(__name__)
+
+
+# A custom widget to show the status of the internal keyboard and toggle it.
+# The XInput "Device Enabled" property is read and set directly over our own
+# X connection; the xinput CLI and toggle_script are only fallbacks.
+class InternalKeyboardToggle(base.ThreadPoolText):
+    defaults = [
+        ("keyboard_name", "AT Translated Set 2 keyboard", "XInput name of the keyboard to toggle"),
+        ("toggle_script", None, "Script to run if the XInput property can't be set directly"),
+        ("has_tool", shutil.which, "has_tool(name) -> truthy if the program is installed"),
+        ("update_interval", 2, "Seconds between polls"),
+    ]
+    XI_CHANGE_PROPERTY = 57  # XIChangeProperty opcode
+
+    def __init__(self, **config):
+        base.ThreadPoolText.__init__(self, "[?]", **config)
+        self.add_defaults(InternalKeyboardToggle.defaults)
+        self._xinput = None  # (conn, extension, device id, atom); False once found unusable
+        self._xinput_lock = threading.Lock()
+        self.add_callbacks({'Button1': self.toggle_keyboard})
+
+    @staticmethod
+    def _label(enabled):
+        return "[on.]" if enabled else "[off]"
+
+    def _xi(self):
+        if self._xinput is None:
+            try:
+                import xcffib
+                import xcffib.xinput
+                conn = xcffib.connect(display=os.environ.get("DISPLAY"))
+                ext = conn(xcffib.xinput.key)
+                ext.XIQueryVersion(2, 0).reply()
+                infos = ext.XIQueryDevice(0).reply().infos  # 0 = XIAllDevices
+                device = next((d.deviceid for d in infos if d.name.to_string() == self.keyboard_name), None)
+                if device is None:
+                    conn.disconnect()
+                    raise LookupError(f"no XInput device named {self.keyboard_name!r}")
+                atom = conn.core.InternAtom(True, len("Device Enabled"), "Device Enabled").reply().atom
+                self._xinput = (conn, ext, device, atom)
+            except Exception as e:
+                logger.warning(f"{self.name}: XInput unavailable ({e}), falling back to xinput/toggle_script")
+                self._xinput = False
+        return self._xinput or None
+
+    def _get_enabled(self):
+        """(enabled, property type) from XInput, or None if it can't be read."""
+        xi = self._xi()
+        if xi is None:
+            return None
+        _, ext, device, atom = xi
+        reply = ext.XIGetProperty(device, False, atom, 0, 0, 1).reply()
+        if not reply.num_items:
+            return None
+        return bool(reply.data8[0]), reply.type
+
+    def _set_enabled(self, enabled, prop_type):
+        _, ext, device, atom = self._xinput
+        # packed by hand: xcffib's XIChangeProperty mangles the 8-bit item list
+        header = struct.pack("=xx2xHBBIII", device, 0, 8, atom, prop_type, 1)
+        ext.send_request(self.XI_CHANGE_PROPERTY, io.BytesIO(header + bytes([enabled])), is_checked=True).check()
+
+    def _drop_xinput(self):
+        # device ids change when the keyboard is re-added; look it up again next time
+        if self._xinput:
+            self._xinput[0].disconnect()
+        self._xinput = None
+
+    def poll(self):
+        with self._xinput_lock:
+            try:
+                state = self._get_enabled()
+            except Exception:
+                self._drop_xinput()
+                state = None
+        if state is not None:
+            return self._label(state[0])
+        if not self.has_tool('xinput'):
+            return "[N/A]"
+        try:
+            # Check the "Device Enabled" property using xinput
+            props = subprocess.check_output(['xinput', 'list-props', self.keyboard_name], text=True)
+            for line in props.split('\n'):
+                if "Device Enabled" in line:
+                    # The state is the last field on the line (0 or 1)
+                    state = line.split()[-1]
+                    return "[on.]" if state == '1' else "[off]"
+            return "[err]"
+        except (subprocess.CalledProcessError, FileNotFoundError):
+            # Return error state if xinput fails or keyboard not found
+            return "[N/A]"
+
+    def _toggle(self):
+        with self._xinput_lock:
+            try:
+                state = self._get_enabled()
+                if state is not None:
+                    self._set_enabled(not state[0], state[1])
+                    # show what the server reports back, not what we asked for
+                    confirmed = self._get_enabled()
+                    if confirmed is not None:
+                        return self._label(confirmed[0])
+            except Exception as e:
+                logger.warning(f"{self.name}: XInput toggle failed ({e})")
+                self._drop_xinput()
+        if self.toggle_script:
+            try:
+                # wait for the script so the poll below sees its result
+                subprocess.run([self.toggle_script], check=False)
+            except OSError as e:
+                logger.warning(f"{self.name}: {self.toggle_script} failed: {e}")
+        return self.poll()
+
+    def toggle_keyboard(self):
+        def done(future):
+            try:
+                self.update(future.result())
+            except Exception:
+                logger.exception(f"{self.name}: toggle failed")
+        self.qtile.run_in_executor(self._toggle).add_done_callback(done)
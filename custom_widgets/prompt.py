@@ -0,0 +1,67 @@
+import functools
+
+from libqtile import widget
+from libqtile.widget.prompt import CommandCompleter
+
+
+# spawncmd prompt whose "cmd" completion is answered from a prebuilt index
+# (CommandIndex in services/indexes.py) instead of globbing every $PATH
+# directory on the first Tab.
+class IndexedCommandCompleter:
+    def __init__(self, qtile_instance, index=None):
+        self.index = index
+        self._fallback = None
+        self.lookup = None
+        self.offset = -1
+        self.thisfinal = None
+
+    def actual(self):
+        if self._fallback is not None:
+            return self._fallback.actual()
+        return self.thisfinal
+
+    def reset(self):
+        if self._fallback is not None:
+            self._fallback.reset()
+        self._fallback = None
+        self.lookup = None
+        self.offset = -1
+
+    def complete(self, txt, aliases=None):
+        # paths, and anything asked before the index is built, use the stock completer
+        if (self._fallback is not None or (txt and txt[0] in "~/")
+                or self.index is None or not self.index.ready.is_set()):
+            if self._fallback is None:
+                self._fallback = CommandCompleter(None)
+            # qtile < 0.24 completers take no aliases
+            return self._fallback.complete(txt, aliases) if aliases else self._fallback.complete(txt)
+        if self.lookup is None:
+            # (display value, actual value), as in CommandCompleter
+            self.lookup = [(name, name) for name in self.index.complete(txt)]
+            self.lookup += sorted((alias, cmd) for alias, cmd in (aliases or {}).items() if alias.startswith(txt))
+            self.lookup.append((txt, txt))
+            self.offset = -1
+        self.offset = (self.offset + 1) % len(self.lookup)
+        display, self.thisfinal = self.lookup[self.offset]
+        return display
+
+class CommandPrompt(widget.Prompt):
+    defaults = [
+        ("command_index", None, "Object with ready (Event) and complete(prefix) for cmd completion"),
+        ("on_command", None, "on_command(text) after a command is run from the cmd prompt"),
+    ]
+
+    def __init__(self, **config):
+        config.setdefault("name", "prompt")
+        widget.Prompt.__init__(self, **config)
+        self.add_defaults(CommandPrompt.defaults)
+        self.completers = {
+            **widget.Prompt.completers,
+            "cmd": functools.partial(IndexedCommandCompleter, index=self.command_index),
+        }
+
+    def _send_cmd(self):
+        is_cmd = isinstance(self.completer, IndexedCommandCompleter)
+        widget.Prompt._send_cmd(self)
+        if is_cmd and self.user_input and self.on_command is not None:
+            self.on_command(self.user_input)
@@ -0,0 +1,31 @@
+# The D-Bus library qtile itself uses: dbus-fast since qtile 0.30, dbus-next
+# before. Their APIs match, so callers use whichever module library() returns.
+
+import importlib
+import logging
+
+logger = logging.getLogger(__name__)
+
+DBUS_LIBRARIES = ("dbus_fast", "dbus_next")
+
+_library = None
+_missing_logged = False
+
+
+def library():
+    """The first of DBUS_LIBRARIES that imports (with its aio submodule), or
+    None, logged once, when neither is installed."""
+    global _library, _missing_logged
+    if _library is not None:
+        return _library
+    for name in DBUS_LIBRARIES:
+        try:
+            importlib.import_module(name + ".aio")
+        except ImportError:
+            continue
+        _library = importlib.import_module(name)
+        return _library
+    if not _missing_logged:
+        _missing_logged = True
+        logger.warning(f"no D-Bus library ({' or '.join(DBUS_LIBRARIES)}), D-Bus features are off")
+    return None
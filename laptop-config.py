@@ -9,15 +9,35 @@
 # +===========================================================================+
 
 
+import asyncio
 import logging
 import os
-import shutil
+import shlex
 import subprocess
+import sys
+import time
+
+# start of this config execution, for the "config import" trace span
+_config_exec_start = time.perf_counter()
 
 from libqtile import bar, hook, layout, qtile, widget
-from libqtile.config import Click, Drag, Group, Key, KeyChord, Match, Screen
+from libqtile.config import Click, Drag, Group, Key, KeyChord, Match, ScratchPad, Screen
 from libqtile.lazy import lazy
-from libqtile.widget import base
+
+import custom_widgets  # lives next to this file; widgets import on first use
+import notifications
+from services import batch, hotreload, launcher, screenshot
+from services.affinity import apply_group_affinity
+from services.bluez import BluetoothInventory
+from services.diagnostics import (
+    LOG_DUMP_FILE, STALL_THRESHOLD, LogPipeline, StallWatchdog, trace_span, trace_widget_configure, traced, tracer,
+)
+from services.focus import MouseFocus
+from services.indexes import CommandIndex, DesktopEntryIndex, MimeHandlerCache, ToolProbe
+from services.placement import PlacementRules
+from services.power import CLOCK_FORMAT_SECONDS, PowerPolicy
+from services.termpool import POOL_GROUP, TerminalPool
+from services.worker import memory_report, run_blocking
 
 # ---------------------------------------------------------------------------
 # Constants
@@ -27,6 +47,8 @@ ALT = "mod1"   # Alt key
 TERMINAL = "kitty"
 FONT_PRIMARY = "monospace"
 DEFAULT_GAP_SIZE = 5
+INTERNAL_KEYBOARD = "AT Translated Set 2 keyboard"  # XInput device name
+KEYBOARD_TOGGLE_SCRIPT = os.path.expanduser("~/.local/bin/keyblock.sh")  # fallback toggle
 
 # colors (config1-style dict)
 colors = {
@@ -48,72 +70,63 @@ colors = {
     "bluetooth_chord_bg":  "#FFFFFF",
 }
 
+# ---------------------------------------------------------------------------
+# Diagnostics: log pipeline (dump with MOD+ctrl+shift+l), QTILE_TRACE spans and
+# the QTILE_STALL_WATCHDOG stall watchdog, all in services/diagnostics.py
+# ---------------------------------------------------------------------------
+# loggers routed through the pipeline: the config's and its modules'
+LOG_PIPELINE_LOGGERS = (__name__, "custom_widgets", "notifications", "dbus_compat", "config_bench", "services")
+
 logger = logging.getLogger(__name__)
+if globals().get('log_pipeline') is None:
+    log_pipeline = LogPipeline()
+log_pipeline.attach(*LOG_PIPELINE_LOGGERS)
 logger.critical("QTILE CONFIG v3 (multimonitor): start")
 
+def dump_log_buffer(qtile_instance=None):
+    def work():
+        count = log_pipeline.dump()
+        notifier.notify("Qtile log", f"{count} lines written to {LOG_DUMP_FILE}", tag="log-dump")
+    run_blocking(work, name="log-dump")
+
+_config_phase = "reload" if globals().get('_config_phase') else "startup"
+
+if globals().get('stall_watchdog') is None:
+    stall_watchdog = StallWatchdog(STALL_THRESHOLD) if STALL_THRESHOLD > 0 else None
+    if stall_watchdog is not None:
+        stall_watchdog.install()
+
 # dynamic gaps flag
 gaps_enabled = True
 
 # ---------------------------------------------------------------------------
-# Widgets
-# ---------------------------------------------------------------------------
-class BluetoothCtlWidget(base.ThreadPoolText):
-    def __init__(self, **config):
-        base.ThreadPoolText.__init__(self, "", **config)
-        self.update_interval = 5
-        self.add_callbacks({'Button1': self.toggle_power, 'Button3': self.open_bluetoothctl})
-
-    def _get_power_status(self):
-        try:
-            output = subprocess.check_output(['bluetoothctl', 'show'], text=True)
-            return "On" if 'Powered: yes' in output else "Off"
-        except (subprocess.CalledProcessError, FileNotFoundError):
-            return "N/A"
-
-    def poll(self):
-        return f"BT: {self._get_power_status()}"
-
-    def toggle_power(self):
-        status = self._get_power_status()
-        if status == "On":
-            qtile.cmd_spawn('bluetoothctl power off')
-            qtile.cmd_spawn('notify-send "Bluetooth" "Bluetooth turned OFF."')
-        elif status == "Off":
-            qtile.cmd_spawn('bluetoothctl power on')
-            qtile.cmd_spawn('notify-send "Bluetooth" "Bluetooth turned ON."')
-        self.update(self.poll())
-
-    def open_bluetoothctl(self):
-        qtile.cmd_spawn(f"{TERMINAL} -e bluetoothctl")
-
-# A custom widget to show the status of the internal keyboard and toggle it.
-class InternalKeyboardToggle(base.ThreadPoolText):
-    def __init__(self, **config):
-        base.ThreadPoolText.__init__(self, "[?]", **config)
-        self.update_interval = 2
-        self.keyboard_name = "AT Translated Set 2 keyboard"
-        self.toggle_script_path = "/home/tori/.local/bin/keyblock.sh"
-        self.add_callbacks({'Button1': self.toggle_keyboard})
-
-    def poll(self):
-        try:
-            # Check the "Device Enabled" property using xinput
-            props = subprocess.check_output(['xinput', 'list-props', self.keyboard_name], text=True)
-            for line in props.split('\n'):
-                if "Device Enabled" in line:
-                    # The state is the last field on the line (0 or 1)
-                    state = line.split()[-1]
-                    return "[on.]" if state == '1' else "[off]"
-            return "[err]"
-        except (subprocess.CalledProcessError, FileNotFoundError):
-            # Return error state if xinput fails or keyboard not found
-            return "[N/A]"
-
-    def toggle_keyboard(self):
-        qtile.cmd_spawn(self.toggle_script_path)
-        # Immediately update the text after running the script for instant feedback
-        self.update(self.poll())
-
+# Background services: created on the first load only, they outlive reloads
+# ---------------------------------------------------------------------------
+# helper programs whose absence is logged at startup (tools.has() takes any)
+TOOLS = (
+    "bluetoothctl", "xinput", "autorandr", "xrandr", "brightnessctl", "xbacklight",
+    "amixer", "pactl", "rofi", "scrot", "xclip",
+)
+BLUETOOTH_WIDGET = "bluetooth"
+
+if globals().get('command_index') is None:
+    command_index = CommandIndex().start()
+if globals().get('tools') is None:
+    tools = ToolProbe(command_index, TOOLS)
+if globals().get('desktop_index') is None:
+    desktop_index = DesktopEntryIndex().start()
+if globals().get('mime_handlers') is None:
+    mime_handlers = MimeHandlerCache(desktop_index, TERMINAL).start()
+mime_handlers.terminal = TERMINAL
+if globals().get('notifier') is None:
+    notifier = notifications.Notifier()
+if globals().get('bluetooth_devices') is None:
+    bluetooth_devices = BluetoothInventory(
+        BLUETOOTH_WIDGET, lambda summary, body: notifier.notify(summary, body, tag="bluetooth"))
+if globals().get('power_policy') is None:
+    power_policy = PowerPolicy().start()
+else:
+    power_policy.reapply()  # to whichever widgets exist now
 
 # ---------------------------------------------------------------------------
 # Helpers
@@ -131,43 +144,324 @@ def toggle_gaps(qtile_instance):
         qtile_instance.config.floating_layout.margin = new_margin
 
     status_message = "Enabled" if gaps_enabled else "Disabled"
-    qtile_instance.cmd_spawn(f'notify-send "Qtile Gaps" "Window gaps are now {status_message}."')
+    notifier.notify("Qtile Gaps", f"Window gaps are now {status_message}.", tag="gaps")
     logger.info(f"gaps -> {status_message} (margin={new_margin})")
     qtile_instance.reload_config()
 
-# Choose group on a specific screen (without stealing focus from primary)
-# screen_index: 0 = laptop(primary), 1 = external
+def spawn_tool(qtile_instance, command, *fallbacks, requires=()):
+    """Spawns the first of command and fallbacks whose programs (plus the
+    ones in requires) are installed, or notifies which one is missing."""
+    first = None
+    for cmd in (command, *fallbacks):
+        missing = tools.first_missing(shlex.split(cmd)) or next((t for t in requires if not tools.has(t)), None)
+        if missing is None:
+            qtile_instance.cmd_spawn(cmd)
+            return
+        first = first or missing
+    notifier.notify("Missing tool", f"{first} is not installed", tag="tools")
+
+# Choose group on a specific screen (without stealing focus from the current one)
+# screen_index: 0 = laptop(primary), 1.. = externals in qtile's screen order
 
 def choose_group_on_screen(qtile_instance, group_name: str, screen_index: int):
+    if screen_index >= len(qtile_instance.screens):
+        logger.info(f"choose_group_on_screen: no screen {screen_index} connected")
+        return
     try:
-        current = qtile_instance.current_screen.index
-        # jump to target screen, show the group there, then jump back
-        qtile_instance.cmd_to_screen(screen_index)
-        qtile_instance.groups_map[group_name].cmd_toscreen()
-        qtile_instance.cmd_to_screen(current)
+        qtile_instance.screens[screen_index].set_group(qtile_instance.groups_map[group_name], warp=False)
     except Exception as e:
         logger.error(f"choose_group_on_screen error: {e}")
 
-# Convenience wrappers for digits 1..9 -> external screen index 1
+# Convenience wrappers for digits 1..9 -> a given screen index
 
-def mk_external_group_key(num: int):
+def mk_screen_group_key(num: int, screen_index: int):
     name = str(num)
     def _fn(q):
-        choose_group_on_screen(q, name, 1)
+        choose_group_on_screen(q, name, screen_index)
     return _fn
 
+# ---------------------------------------------------------------------------
+# Batched commands: this config's ops for the socket in services/batch.py
+# ---------------------------------------------------------------------------
+
+def set_gaps(qtile_instance, enabled):
+    """Sets layout margins and relayouts visible groups, without a config reload."""
+    global gaps_enabled
+    gaps_enabled = enabled
+    margin = DEFAULT_GAP_SIZE if enabled else 0
+    for lyt in [*qtile_instance.config.layouts, qtile_instance.config.floating_layout]:
+        if hasattr(lyt, 'margin'):
+            lyt.margin = margin
+    for group in qtile_instance.groups:
+        for lyt in group.layouts:
+            if hasattr(lyt, 'margin'):
+                lyt.margin = margin
+        if group.screen:
+            group.layout_all()
+
+@batch.batch_op("gaps")
+def _batch_gaps(qtile_instance, op):
+    set_gaps(qtile_instance, bool(op["enabled"]))
+    return gaps_enabled
+
+@batch.batch_op("dump_log")
+def _batch_dump_log(qtile_instance, op):
+    return log_pipeline.dump()
+
+@batch.batch_op("stalls")
+def _batch_stalls(qtile_instance, op):
+    # counted here, not from the log, which rate-limits the stall warnings
+    if stall_watchdog is None:
+        return None
+    return {"stalls": stall_watchdog.stalls, "stalled_ms": round(stall_watchdog.stalled_ms)}
+
+# ---------------------------------------------------------------------------
+# Group affinity: which groups prefer which monitor, see services/affinity.py
+# ---------------------------------------------------------------------------
+GROUP_AFFINITY = {
+    "eDP-1": "1234",
+    "HDMI-1": "5678",
+    "DP-1": "5678",
+    "DP-2": "9",
+}
+
+# modifiers for the generated "show group N on screen S" bindings (+ digit);
+# also how many screens get a Screen() definition
+SCREEN_GROUP_MODIFIERS = [
+    [MOD, "control"],           # screen 0: laptop (primary)
+    [MOD, ALT],                 # screen 1
+    [MOD, ALT, "shift"],        # screen 2
+    [MOD, ALT, "control"],      # screen 3
+]
+
 # Try to let the system apply layouts on hotplug, then tell qtile to re-read screens
 
+@traced("autorandr")
 def _maybe_autorandr():
     try:
-        if shutil.which('autorandr'):
+        if tools.has('autorandr'):
             subprocess.run(['autorandr', '--change'], check=False)
-        else:
+        elif tools.has('xrandr'):
             # Fallback: best effort xrandr --auto
             subprocess.run(['xrandr', '--auto'], check=False)
     except Exception as e:
         logger.warning(f"autorandr/xrandr failed: {e}")
 
+# ---------------------------------------------------------------------------
+# App placement: rules tried in order, see PlacementRules for the keys
+# ---------------------------------------------------------------------------
+PLACEMENT_RULES = [
+    {"wm_class": "pavucontrol", "float": True},
+    {"wm_class": "blueman-manager", "float": True},
+    {"wm_class": "veracrypt", "float": True},
+    {"title": r"^Picture[- ]in[- ]picture$", "float": True},
+    # {"wm_class": "firefox", "group": "2"},
+    # {"wm_class": "discord", "group": "9", "screen": 1},
+]
+
+placement = PlacementRules(PLACEMENT_RULES)
+
+# ---------------------------------------------------------------------------
+# Terminal pool: prelaunched terminals for MOD+Return, on with QTILE_TERMINAL_POOL=1
+# ---------------------------------------------------------------------------
+TERMINAL_POOL = bool(os.environ.get('QTILE_TERMINAL_POOL'))
+
+if globals().get('terminal_pool') is None:
+    terminal_pool = TerminalPool(power_policy, tools.has)
+terminal_pool.terminal, terminal_pool.enabled = TERMINAL, TERMINAL_POOL
+power_policy.listeners = [lambda mode: terminal_pool.refill(qtile)]
+
+def launch_terminal(qtile_instance):
+    if TERMINAL_POOL:
+        terminal_pool.claim(qtile_instance)
+    else:
+        qtile_instance.cmd_spawn(TERMINAL)
+
+# ---------------------------------------------------------------------------
+# Launcher: rofi -dmenu fed from the in-memory indexes, `rofi -show` as fallback
+# ---------------------------------------------------------------------------
+LAUNCHER_TIMING = bool(os.environ.get('QTILE_LAUNCHER_TIMING'))
+
+def rofi_show(qtile_instance, mode):
+    if not tools.has('rofi'):
+        # the spawncmd prompt can stand in for "run"; the other modes need rofi
+        if mode == "run":
+            qtile_instance.cmd_spawncmd()
+        else:
+            notifier.notify("Launcher", "rofi is not installed", tag="launcher")
+        return
+    if LAUNCHER_TIMING:
+        launcher.time_first_map(f"show:{mode}")
+    qtile_instance.cmd_spawn(f"rofi -show {mode}")
+
+def rofi_dmenu(qtile_instance, labels, prompt, on_select, fallback_mode):
+    """Shows labels in rofi -dmenu; on_select(index, text) runs on the event
+    loop. index is -1 for custom input. Without a fallback_mode, failures
+    are only reported."""
+    def fallback(reason):
+        if fallback_mode is None:
+            notifier.notify("Launcher", f"rofi {reason}", tag="launcher")
+        else:
+            logger.warning(f"rofi dmenu {reason}, falling back to rofi -show {fallback_mode}")
+            rofi_show(qtile_instance, fallback_mode)
+
+    if not tools.has('rofi'):
+        fallback("is not installed")
+        return
+    if LAUNCHER_TIMING:
+        launcher.time_first_map(f"dmenu:{prompt}")
+    launcher.dmenu(labels, prompt, on_select, fallback)
+
+def launch_apps(qtile_instance):
+    if not desktop_index.ready.is_set():
+        rofi_show(qtile_instance, "drun")
+        return
+    entries = desktop_index.entries()
+
+    def chosen(index, text):
+        if 0 <= index < len(entries):
+            entry = entries[index]
+            qtile_instance.cmd_spawn(f"{TERMINAL} -e {entry['exec']}" if entry["terminal"] else entry["exec"])
+    rofi_dmenu(qtile_instance, [e["name"] for e in entries], "apps", chosen, "drun")
+
+if globals().get('window_history') is None:
+    window_history = launcher.WindowHistory()
+
+def launch_windows(qtile_instance):
+    windows = window_history.windows(qtile_instance.current_window)
+
+    def chosen(index, text):
+        if 0 <= index < len(windows):
+            qtile_instance.find_window(windows[index].wid)
+    rofi_dmenu(qtile_instance, [f"{w.group.name}: {w.name}" for w in windows], "windows", chosen, "window")
+
+def pick_bluetooth_device(qtile_instance, want=None):
+    """Known Bluetooth devices in rofi; choosing one connects or disconnects
+    it. want="connect"/"disconnect" lists only devices that can do that."""
+    if not bluetooth_devices.available:
+        spawn_tool(qtile_instance, f"{TERMINAL} -e bluetoothctl {want or 'devices'}")
+        return
+    items = [(path, d) for path, d in bluetooth_devices.devices.items()
+             if want is None or d["connected"] == (want == "disconnect")]
+    items.sort(key=lambda item: (not item[1]["connected"], not item[1]["paired"], (item[1]["name"] or "").lower()))
+    if not items:
+        notifier.notify("Bluetooth", f"No devices to {want or 'show'}.", tag="bluetooth")
+        return
+
+    def chosen(index, text):
+        if 0 <= index < len(items):
+            bluetooth_devices.toggle(items[index][0])
+    rofi_dmenu(qtile_instance, [BluetoothInventory.describe(d) for _, d in items], "bluetooth", chosen, None)
+
+def launch_run(qtile_instance):
+    if not command_index.ready.is_set():
+        rofi_show(qtile_instance, "run")
+        return
+
+    def chosen(index, text):
+        if text.strip():
+            run_blocking(command_index.record, text)
+            qtile_instance.cmd_spawn(text)
+    rofi_dmenu(qtile_instance, command_index.complete(""), "run", chosen, "run")
+
+# What the clickable [g]/[f]/[w] TextBoxes open, per mouse button: a URL or
+# path opens with its mime_handlers entry (else xdg-open), a list is an argv.
+BAR_LAUNCHERS = {
+    "[g]": {"Button1": "https://gemini.google.com/app", "Button3": "https://www.google.com/"},
+    "[f]": {"Button1": ["thunar"], "Button3": ["veracrypt"]},
+    "[w]": {"Button1": [TERMINAL, "-e", "nm-tui"]},
+}
+
+def launcher_argv(target):
+    if isinstance(target, str):
+        return mime_handlers.command(target) or ["xdg-open", target]
+    return list(target)
+
+def open_launcher(qtile_instance, target):
+    argv = launcher_argv(target)
+    missing = tools.first_missing(argv)
+    if missing:
+        notifier.notify("Launcher", f"{missing} is not installed", tag="launcher")
+        return
+    qtile_instance.cmd_spawn(argv)
+
+def check_bar_launchers():
+    desktop_index.ready.wait(10)
+    for label, buttons in BAR_LAUNCHERS.items():
+        for button, target in buttons.items():
+            if isinstance(target, str) and mime_handlers.command(target) is None:
+                logger.warning(f"bar launcher {label} {button}: no handler for {target}, will use xdg-open")
+            missing = tools.first_missing(launcher_argv(target))
+            if missing:
+                logger.warning(f"bar launcher {label} {button}: {missing} not found on $PATH")
+
+def launcher_callbacks(label):
+    return {button: lazy.function(open_launcher, target) for button, target in BAR_LAUNCHERS[label].items()}
+
+
+# ---------------------------------------------------------------------------
+# Screenshots: in-process region capture to the clipboard, scrot | xclip fallback
+# ---------------------------------------------------------------------------
+SCREENSHOT_FALLBACK_CMD = 'bash -c "scrot -s - | xclip -selection clipboard -target image/png -i"'
+SCREENSHOT_FALLBACK_TOOLS = ("scrot", "xclip")
+
+def screenshot_fallback(qtile_instance):
+    spawn_tool(qtile_instance, SCREENSHOT_FALLBACK_CMD, requires=SCREENSHOT_FALLBACK_TOOLS)
+
+def screenshot_to_clipboard(qtile_instance):
+    if qtile_instance.core.name != "x11":
+        screenshot_fallback(qtile_instance)
+        return
+
+    def failed(e):
+        logger.warning(f"native screenshot failed ({e}), falling back to scrot")
+        qtile_instance.call_soon_threadsafe(screenshot_fallback, qtile_instance)
+    screenshot.region_to_clipboard(failed)
+
+# ---------------------------------------------------------------------------
+# Focus follows mouse: debounced by QTILE_FOCUS_DWELL (0 = follow_mouse_focus)
+# ---------------------------------------------------------------------------
+mouse_focus = MouseFocus()
+
+# ---------------------------------------------------------------------------
+# Config hot reload: with QTILE_CONFIG_WATCH=1, saving this file redoes only what
+# the changed sections need; edits under services/ need a full reload
+# ---------------------------------------------------------------------------
+CONFIG_WATCH = bool(os.environ.get('QTILE_CONFIG_WATCH'))
+
+# section -> what a change to it needs; sections not listed mean a full reload
+HOT_RELOAD_SECTIONS = {
+    "Constants": {"constants"},
+    "Helpers": {"keys"},
+    "Batched commands": {"keys"},
+    "Group affinity": {"keys"},
+    "App placement": set(),
+    "Terminal pool": {"keys"},
+    "Launcher": {"keys", "bar"},
+    "Screenshots": {"keys"},
+    "Focus follows mouse": set(),
+    "Config hot reload": set(),
+    "Keys": {"keys"},
+    "Layouts": {"layouts"},
+    "Screens": {"bar"},
+    "General settings": set(),
+}
+# the same for a changed constant
+HOT_RELOAD_CONSTANTS = {
+    "MOD": {"keys", "mouse"},
+    "ALT": {"keys"},
+    "TERMINAL": {"keys", "bar"},
+    "FONT_PRIMARY": {"bar"},
+    "DEFAULT_GAP_SIZE": {"layouts"},
+    "INTERNAL_KEYBOARD": {"bar"},
+    "KEYBOARD_TOGGLE_SCRIPT": {"bar"},
+    "colors": {"layouts", "bar"},
+}
+
+config_sections = hotreload.read_sections(__file__)
+if CONFIG_WATCH:
+    hotreload.watch(sys.modules[__name__])
+
 # ---------------------------------------------------------------------------
 # Keys
 # ---------------------------------------------------------------------------
@@ -196,12 +490,13 @@ keys = [
     Key([MOD, "shift"], "Return", lazy.layout.toggle_split(), desc="Toggle split"),
 
     # Launchers
-    Key([MOD], "Return", lazy.spawn(TERMINAL), desc=f"Terminal ({TERMINAL})"),
+    Key([MOD], "Return", lazy.function(launch_terminal), desc=f"Terminal ({TERMINAL})"),
     Key([MOD], "r", lazy.spawncmd(), desc="Spawn command"),
 
     # Screenshots (both aliases)
-    Key([ALT], "space", lazy.spawn('bash -c "scrot -s - | xclip -selection clipboard -target image/png -i"'), desc="Screenshot (scrot)"),
-    Key([ALT, "shift"], "space", lazy.spawn('scrotum'), desc="Screenshot (scrotum)"),
+    Key([ALT], "space", lazy.function(screenshot_to_clipboard), desc="Screenshot region to clipboard"),
+    Key([ALT, "control"], "space", lazy.function(screenshot_fallback), desc="Screenshot (scrot)"),
+    Key([ALT, "shift"], "space", lazy.function(spawn_tool, 'scrotum'), desc="Screenshot (scrotum)"),
 
     # Window mgmt
     Key([MOD], "w", lazy.window.kill(), desc="Kill"),
@@ -212,41 +507,46 @@ keys = [
     Key([MOD, "control"], "r", lazy.reload_config(), desc="Reload"),
     Key([MOD, "control"], "q", lazy.shutdown(), desc="Quit"),
     Key([MOD, "control", "shift"], "z", lazy.function(toggle_gaps), desc="Toggle gaps"),
+    Key([MOD, "control", "shift"], "l", lazy.function(dump_log_buffer), desc="Dump config log buffer"),
+    Key([MOD, "control", "shift"], "m", lazy.function(memory_report), desc="Write memory report"),
 
     # Rofi chord
     KeyChord([MOD], "tab", [
-        Key([], "Tab", lazy.spawn("rofi -show drun"), lazy.ungrab_chord(), desc='Apps'),
-        Key([], "w", lazy.spawn("rofi -show window"), lazy.ungrab_chord(), desc='Windows'),
-        Key([], "q", lazy.spawn("rofi -show run"), lazy.ungrab_chord(), desc='Run'),
-        Key([], "f", lazy.spawn("xfe"), lazy.ungrab_chord(), desc="XFE"),
-        Key([], "semicolon", lazy.spawn(TERMINAL), lazy.ungrab_chord(), desc=f"{TERMINAL}"),
-        Key([], "t", lazy.spawn("codium"), lazy.ungrab_chord(), desc="Codium"),
+        Key([], "Tab", lazy.function(launch_apps), lazy.ungrab_chord(), desc='Apps'),
+        Key([], "w", lazy.function(launch_windows), lazy.ungrab_chord(), desc='Windows'),
+        Key([], "q", lazy.function(launch_run), lazy.ungrab_chord(), desc='Run'),
+        Key(["shift"], "Tab", lazy.function(rofi_show, "drun"), lazy.ungrab_chord(), desc='Apps (rofi drun)'),
+        Key(["shift"], "w", lazy.function(rofi_show, "window"), lazy.ungrab_chord(), desc='Windows (rofi window)'),
+        Key(["shift"], "q", lazy.function(rofi_show, "run"), lazy.ungrab_chord(), desc='Run (rofi run)'),
+        Key([], "f", lazy.function(spawn_tool, "xfe"), lazy.ungrab_chord(), desc="XFE"),
+        Key([], "semicolon", lazy.function(spawn_tool, TERMINAL), lazy.ungrab_chord(), desc=f"{TERMINAL}"),
+        Key([], "t", lazy.function(spawn_tool, "codium"), lazy.ungrab_chord(), desc="Codium"),
         Key([], "e", lazy.spawn("xdg-open /home/tori/code/stable/edtr3.html"), lazy.ungrab_chord(), desc="edtr3"),
     ], name="Rofi Launcher"),
 
     # Brightness
     KeyChord([ALT], "j", [
-        Key([], "k", lazy.spawn('brightnessctl set +20%'), desc='Brightness +20%'),
-        Key([], "j", lazy.spawn('brightnessctl set 20%-'), desc='Brightness -20%'),
+        Key([], "k", lazy.function(spawn_tool, 'brightnessctl set +20%', 'xbacklight -inc 20'), desc='Brightness +20%'),
+        Key([], "j", lazy.function(spawn_tool, 'brightnessctl set 20%-', 'xbacklight -dec 20'), desc='Brightness -20%'),
     ], name="Brightness Control", mode=True),
 
     # Volume
     KeyChord([ALT], "u", [
-        Key([], "i", lazy.spawn('amixer -D pulse sset Master 10%+'), desc='Volume +10%'),
-        Key([], "u", lazy.spawn('amixer -D pulse sset Master 10%-'), desc='Volume -10%'),
+        Key([], "i", lazy.function(spawn_tool, 'amixer -D pulse sset Master 10%+', 'pactl set-sink-volume @DEFAULT_SINK@ +10%'), desc='Volume +10%'),
+        Key([], "u", lazy.function(spawn_tool, 'amixer -D pulse sset Master 10%-', 'pactl set-sink-volume @DEFAULT_SINK@ -10%'), desc='Volume -10%'),
     ], name="Volume Control", mode=True),
 
     # Bluetooth (richer)
     KeyChord([ALT], "b", [
-        Key([], "s", lazy.spawn(f"{TERMINAL} -e bluetoothctl scan on"), desc="Scan on"),
-        Key([], "S", lazy.spawn("bluetoothctl scan off"), desc="Scan off"),
-        Key([], "p", lazy.spawn(f"{TERMINAL} -e bluetoothctl pair"), desc="Pair"),
-        Key([], "c", lazy.spawn(f"{TERMINAL} -e bluetoothctl connect"), desc="Connect"),
-        Key([], "d", lazy.spawn(f"{TERMINAL} -e bluetoothctl disconnect"), desc="Disconnect"),
-        Key([], "l", lazy.spawn(f"{TERMINAL} -e bluetoothctl devices"), desc="Devices"),
-        Key([], "t", lazy.spawn(f"{TERMINAL} -e bluetoothctl trust"), desc="Trust"),
-        Key([], "f", lazy.spawn(f"{TERMINAL} -e bluetoothctl forget"), desc="Forget"),
-        Key([], "o", lazy.spawn("bash -c 'if bluetoothctl show | grep -q \"Powered: yes\"; then bluetoothctl power off; else bluetoothctl power on; fi'"), desc="Power toggle"),
+        Key([], "s", lazy.function(spawn_tool, f"{TERMINAL} -e bluetoothctl scan on"), desc="Scan on"),
+        Key([], "S", lazy.function(spawn_tool, "bluetoothctl scan off"), desc="Scan off"),
+        Key([], "p", lazy.function(spawn_tool, f"{TERMINAL} -e bluetoothctl pair"), desc="Pair"),
+        Key([], "c", lazy.function(pick_bluetooth_device, "connect"), desc="Connect"),
+        Key([], "d", lazy.function(pick_bluetooth_device, "disconnect"), desc="Disconnect"),
+        Key([], "l", lazy.function(pick_bluetooth_device), desc="Devices"),
+        Key([], "t", lazy.function(spawn_tool, f"{TERMINAL} -e bluetoothctl trust"), desc="Trust"),
+        Key([], "f", lazy.function(spawn_tool, f"{TERMINAL} -e bluetoothctl forget"), desc="Forget"),
+        Key([], "o", lazy.function(spawn_tool, "bash -c 'if bluetoothctl show | grep -q \"Powered: yes\"; then bluetoothctl power off; else bluetoothctl power on; fi'", requires=("bluetoothctl",)), desc="Power toggle"),
     ], name="Bluetooth Control"),
 ]
 
@@ -258,9 +558,11 @@ for vt_num in range(1, 8):
             desc=f"Switch to VT {vt_num}")
     )
 
-# Bind MOD+ALT+1..9 to set group on external display (screen index 1)
-for i in range(1, 10):
-    keys.append(Key([MOD, ALT], str(i), lazy.function(mk_external_group_key(i)), desc=f"Show group {i} on external screen"))
+# <screen modifiers>+1..9 shows that group on the screen (see SCREEN_GROUP_MODIFIERS)
+for screen_index, mods in enumerate(SCREEN_GROUP_MODIFIERS):
+    for i in range(1, 10):
+        keys.append(Key(mods, str(i), lazy.function(mk_screen_group_key(i, screen_index)),
+                        desc=f"Show group {i} on screen {screen_index}"))
 
 # ---------------------------------------------------------------------------
 # Groups
@@ -273,6 +575,10 @@ for i in groups:
         Key([MOD, "shift"], i.name, lazy.window.togroup(i.name, switch_group=True), desc=f"Move window to {i.name} & follow"),
     ])
 
+# hidden group holding prelaunched terminals (see "Terminal pool")
+if TERMINAL_POOL:
+    groups.append(ScratchPad(POOL_GROUP, []))
+
 # ---------------------------------------------------------------------------
 # Layouts
 # ---------------------------------------------------------------------------
@@ -290,13 +596,13 @@ layouts = [
 ]
 
 # ---------------------------------------------------------------------------
-# Screens: define two. Primary (index 0) has the bar. Secondary (index 1) no bar.
-# Qtile will use only as many as are connected; extra definitions are ignored.
-# On hotplug, we trigger reconfigure_screens so the second screen attaches.
+# Screens: primary (index 0) has the bar, the others none; one definition per
+# entry in SCREEN_GROUP_MODIFIERS, extra definitions are ignored.
 # ---------------------------------------------------------------------------
 widget_defaults = dict(font=FONT_PRIMARY, fontsize=12, padding=3, background=colors["black"]) 
 extension_defaults = widget_defaults.copy()
 
+_widgets_start = time.perf_counter()
 _primary_bar = bar.Bar([
     widget.GroupBox(
         desc="Groups",
@@ -310,8 +616,15 @@ _primary_bar = bar.Bar([
         padding_x=5,
         borderwidth=2,
     ),
-    widget.Prompt(desc="spawncmd", width=10, prompt="> "),
+    custom_widgets.CommandPrompt(
+        desc="spawncmd",
+        width=10,
+        prompt="> ",
+        command_index=command_index,
+        on_command=lambda text: run_blocking(command_index.record, text),
+    ),
     widget.WindowName(desc="Focused window"),
+    widget.TextBox("", name=notifications.NOTIFY_FALLBACK_WIDGET, foreground=colors["red"], desc="Notifications (no daemon)"),
     widget.Chord(
         chords_colors={
             "Rofi Launcher":      (colors["launch_chord_fg"], colors["launch_chord_bg"]),
@@ -323,20 +636,37 @@ _primary_bar = bar.Bar([
         desc="Chord name"
     ),
     # This widget shows the on/off state of the internal keyboard
-    InternalKeyboardToggle(foreground=colors["red"], desc="Toggle internal keyboard"),
-    widget.TextBox("[g]", mouse_callbacks={'Button1': lazy.spawn('xdg-open https://gemini.google.com/app')}, foreground=colors["white"], desc="Gemini"),
-    widget.TextBox("[f]", mouse_callbacks={'Button1': lazy.spawn('thunar'), 'Button3': lazy.spawn('veracrypt')}, foreground=colors["white"], desc="Files/VeraCrypt"),
-    widget.TextBox("[w]", mouse_callbacks={'Button1': lazy.spawn(f'{TERMINAL} -e nm-tui')}, foreground=colors["white"], desc="Wi-Fi TUI"),
-    BluetoothCtlWidget(foreground=colors["red"], desc="Bluetooth"),
+    custom_widgets.InternalKeyboardToggle(
+        foreground=colors["red"],
+        keyboard_name=INTERNAL_KEYBOARD,
+        toggle_script=KEYBOARD_TOGGLE_SCRIPT,
+        has_tool=tools.has,
+        desc="Toggle internal keyboard",
+    ),
+    widget.TextBox("[g]", mouse_callbacks=launcher_callbacks("[g]"), foreground=colors["white"], desc="Gemini/Google"),
+    widget.TextBox("[f]", mouse_callbacks=launcher_callbacks("[f]"), foreground=colors["white"], desc="Files/VeraCrypt"),
+    widget.TextBox("[w]", mouse_callbacks=launcher_callbacks("[w]"), foreground=colors["white"], desc="Wi-Fi TUI"),
+    custom_widgets.BluetoothCtlWidget(
+        name=BLUETOOTH_WIDGET,
+        terminal=TERMINAL,
+        inventory=bluetooth_devices,
+        picker=lambda: pick_bluetooth_device(qtile),
+        notify=lambda summary, body: notifier.notify(summary, body, tag="bluetooth"),
+        has_tool=tools.has,
+        foreground=colors["red"],
+        desc="Bluetooth",
+    ),
     widget.Battery(format='{percent:2.0%}', update_interval=60, low_foreground=colors["alert"], low_percentage=0.25, charge_char='⚡', discharge_char='🔋', desc="Battery"),
     widget.Systray(desc="Tray"),
-    widget.Clock(format="%m-%d-%y %a %I:%M:%S %p", foreground=colors["red"], desc="Clock"),
+    custom_widgets.TabularClock(name="clock", format=CLOCK_FORMAT_SECONDS, foreground=colors["red"], desc="Clock"),
 ], 24, background=colors["black"]) 
+if tracer:
+    tracer.complete("construct widgets", _widgets_start, count=len(_primary_bar.widgets))
+trace_widget_configure(_primary_bar.widgets)
+run_blocking(check_bar_launchers, name="check-launchers")
 
-screens = [
-    Screen(bottom=_primary_bar),  # Screen 0: laptop (primary) with bar
-    Screen(),                     # Screen 1: external, no bar
-]
+screens = [Screen(bottom=_primary_bar)]  # Screen 0: laptop (primary) with bar
+screens += [Screen() for _ in SCREEN_GROUP_MODIFIERS[1:]]  # externals, no bar
 
 # ---------------------------------------------------------------------------
 # Floating + Mouse
@@ -364,8 +694,8 @@ floating_layout = layout.Floating(
 # General settings
 # ---------------------------------------------------------------------------
 dgroups_key_binder = None
-dgroups_app_rules = []
-follow_mouse_focus = True
+dgroups_app_rules = []  # see "App placement"
+follow_mouse_focus = not mouse_focus.enabled  # see "Focus follows mouse"
 bring_front_click = False
 floats_kept_above = True
 cursor_warp = False
@@ -383,22 +713,26 @@ wmname = "LG3D"
 # Hooks: autostart + react to RANDR/Wayland screen changes
 # ---------------------------------------------------------------------------
 @hook.subscribe.startup_once
+@traced("startup_once")
 def autostart():
     # Try to apply a stored layout first (if autorandr exists), then run user's autostart
     _maybe_autorandr()
     home = os.path.expanduser('~/.config/qtile/autostart.sh')
     if os.path.exists(home):
         logger.info(f"Running autostart: {home}")
-        subprocess.run([home], check=False)
+        with trace_span("autostart.sh"):
+            subprocess.run([home], check=False)
     else:
         logger.warning(f"Autostart script not found: {home}")
 
 # On X11, this fires when RANDR changes (plug/unplug). On Wayland, qtile also tracks outputs.
 @hook.subscribe.screen_change
+@traced("hotplug")
 def on_screen_change(event):
     logger.info("screen_change detected -> autorandr --change; reconfigure screens")
     _maybe_autorandr()
-    qtile.cmd_reconfigure_screens()
+    with trace_span("reconfigure_screens"):
+        qtile.cmd_reconfigure_screens()
 
 # Also listen for screens_reconfigured to log the new state
 @hook.subscribe.screens_reconfigured
@@ -407,4 +741,110 @@ def on_screens_reconfigured():
         count = qtile.core.num_screens
         logger.info(f"screens_reconfigured: now {count} screen(s)")
     except Exception:
-        pass
+        count = None
+    apply_group_affinity(qtile, GROUP_AFFINITY)
+    if tracer:
+        tracer.instant("screens_reconfigured", screens=count)
+        tracer.flush()
+
+# screens_reconfigured doesn't fire for the initial screens
+@hook.subscribe.startup_complete
+def initial_group_affinity():
+    apply_group_affinity(qtile, GROUP_AFFINITY)
+
+@hook.subscribe.startup_complete
+def trace_startup_complete():
+    if tracer:
+        tracer.instant("startup_complete")
+        tracer.flush()
+
+# Benchmarks (config_bench.py, next to this file): imported only when one of
+# its QTILE_*_BENCH variables is set; it shuts qtile down when it is done
+@hook.subscribe.startup_complete
+def maybe_run_benchmark():
+    if any(name.startswith('QTILE_') and name.endswith('_BENCH') and value
+           for name, value in os.environ.items()):
+        import config_bench
+        config_bench.run(qtile, sys.modules[__name__])
+
+# Coming back from suspend: re-check AC/blanking right away
+@hook.subscribe.resume
+def on_resume():
+    power_policy.check_now()
+
+if tracer:
+    tracer.complete("config import", _config_exec_start, phase=_config_phase)
+    tracer.flush()
+
+# Batched command socket; it outlives reloads
+@hook.subscribe.startup_complete
+def start_batch_server():
+    asyncio.ensure_future(batch.start_server())
+
+# Stall watchdog heartbeat; it outlives reloads
+@hook.subscribe.startup_complete
+def start_stall_watchdog():
+    if stall_watchdog is not None and stall_watchdog._beat is None:
+        stall_watchdog.start()
+
+# Bluetooth device inventory; it outlives reloads
+@hook.subscribe.startup_complete
+def start_bluetooth_inventory():
+    if not bluetooth_devices.available:
+        asyncio.ensure_future(bluetooth_devices.start())
+
+# Terminal pool bookkeeping
+@hook.subscribe.client_new
+def park_pool_terminal(client):
+    terminal_pool.on_client_new(client)
+
+# Map-time placement, after the terminal pool has parked its prelaunched terminals
+@hook.subscribe.client_new
+def place_new_window(client):
+    placement.place(client)
+
+@hook.subscribe.client_managed
+def time_cold_terminal(client):
+    terminal_pool.on_client_managed(client)
+
+# "float": False placements, once the window is in its group
+@hook.subscribe.client_managed
+def tile_placed_client(client):
+    placement.managed(client)
+
+@hook.subscribe.startup_complete
+def fill_terminal_pool():
+    terminal_pool.refill(qtile)
+
+# Debounced focus follows mouse
+@hook.subscribe.client_mouse_enter
+def focus_on_dwell(client):
+    if mouse_focus.enabled:
+        mouse_focus.entered(client)
+
+@hook.subscribe.client_focus
+def drop_pending_mouse_focus(client):
+    mouse_focus.focused(client)
+
+@hook.subscribe.client_killed
+def forget_pending_mouse_focus(client):
+    if client is mouse_focus.pending:
+        mouse_focus.cancel()
+
+# Window switcher history
+@hook.subscribe.startup_complete
+def seed_window_history():
+    for win in qtile.windows_map.values():
+        window_history.add(win)
+
+@hook.subscribe.client_managed
+def add_to_window_history(client):
+    window_history.add(client)
+
+@hook.subscribe.client_focus
+def touch_window_history(client):
+    window_history.touch(client)
+
+@hook.subscribe.client_killed
+def forget_window_history(client):
+    window_history.forget(client)
@@ -0,0 +1,117 @@
+# Desktop notifications for the configs. One session-bus connection
+# (dbus-fast or dbus-next, see dbus_compat.py) is shared by every notification,
+# instead of a notify-send process per message. Each tag reuses its last
+# notification id, so e.g. repeated gap toggles replace each other. More than
+# NOTIFY_RATE_BURST notifications per tag in NOTIFY_RATE_INTERVAL seconds
+# are held back: the latest tagged one is sent when the interval is up, and
+# untagged ones are dropped. Without a notification daemon, messages show in
+# the bar widget named "notifications" for a few seconds.
+
+import asyncio
+import logging
+import time
+
+from libqtile import qtile
+
+import dbus_compat
+
+logger = logging.getLogger(__name__)
+
+NOTIFY_APP_NAME = "qtile"
+NOTIFY_FALLBACK_WIDGET = "notifications"
+NOTIFY_FALLBACK_SECONDS = 4
+NOTIFY_RATE_BURST = 3
+NOTIFY_RATE_INTERVAL = 10  # seconds
+
+
+class Notifier:
+    def __init__(self, bus_address=None, burst=NOTIFY_RATE_BURST, interval=NOTIFY_RATE_INTERVAL):
+        self.bus_address = bus_address
+        self.burst = burst
+        self.interval = interval
+        self.dropped = 0
+        self._bus = None
+        self._ids = {}      # tag -> last notification id
+        self._windows = {}  # tag -> [window start, count]
+        self._held = {}     # tag -> latest (summary, body, urgent, timeout) over the limit
+        self._tasks = set()
+        self._lock = None   # one Notify in flight, so a tag's next call sees its id
+        self._clear_handle = None
+
+    def notify(self, summary, body="", tag=None, urgent=False, timeout=-1):
+        """Safe to call from any thread."""
+        qtile.call_soon_threadsafe(self._send, tag, (summary, body, urgent, timeout))
+
+    # -- event loop ------------------------------------------------------
+    def _send(self, tag, message):
+        if not self._admit(tag, message):
+            return
+        task = asyncio.ensure_future(self._notify(tag, *message))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    def _admit(self, tag, message):
+        now = time.monotonic()
+        window = self._windows.get(tag)
+        if window is None or now - window[0] >= self.interval:
+            self._windows[tag] = [now, 1]
+            return True
+        window[1] += 1
+        if window[1] <= self.burst:
+            return True
+        if tag is None:
+            self.dropped += 1
+            logger.debug(f"notification dropped, over {self.burst} per {self.interval} s: {message[0]}")
+            return False
+        if tag not in self._held:
+            qtile.call_later(window[0] + self.interval - now, self._release, tag)
+        self._held[tag] = message
+        return False
+
+    def _release(self, tag):
+        message = self._held.pop(tag, None)
+        if message is not None:
+            self._send(tag, message)
+
+    async def _connect(self, dbus):
+        if self._bus is None or not self._bus.connected:
+            self._bus = await dbus.aio.MessageBus(bus_address=self.bus_address).connect()
+        return self._bus
+
+    async def _notify(self, tag, summary, body, urgent, timeout):
+        dbus = dbus_compat.library()
+        if dbus is None:
+            self._show_in_bar(summary, body)
+            return
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            try:
+                bus = await self._connect(dbus)
+                reply = await bus.call(dbus.Message(
+                    destination="org.freedesktop.Notifications",
+                    path="/org/freedesktop/Notifications",
+                    interface="org.freedesktop.Notifications",
+                    member="Notify",
+                    signature="susssasa{sv}i",
+                    body=[NOTIFY_APP_NAME, self._ids.get(tag, 0), "", summary, body, [],
+                          {"urgency": dbus.Variant("y", 2 if urgent else 1)}, timeout],
+                ))
+            except Exception as e:
+                logger.warning(f"notification failed ({e}), showing it in the bar")
+                self._show_in_bar(summary, body)
+                return
+            if reply.message_type == dbus.MessageType.ERROR:
+                logger.debug(f"no notification daemon ({reply.error_name}), showing it in the bar")
+                self._show_in_bar(summary, body)
+            elif tag is not None:
+                self._ids[tag] = reply.body[0]
+
+    def _show_in_bar(self, summary, body):
+        fallback = qtile.widgets_map.get(NOTIFY_FALLBACK_WIDGET)
+        if fallback is None:
+            return
+        fallback.update(f"{summary}: {body}" if body else summary)
+        if self._clear_handle is not None:
+            self._clear_handle.cancel()
+        self._clear_handle = qtile.call_later(NOTIFY_FALLBACK_SECONDS, fallback.update, "")
@@ -0,0 +1 @@
+# Services and helpers behind laptop-config.py, which creates and wires them up.
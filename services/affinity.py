@@ -0,0 +1,100 @@
+# Group affinity: which groups prefer which monitor. Table keys are RandR
+# connector names ("eDP-1") or "edid:" plus the monitor name or
+# manufacturer-product code from its EDID ("edid:DELL U2720Q",
+# "edid:DEL-41A8"), so a monitor keeps its groups on any port; EDID keys win.
+
+import logging
+import os
+
+from services.batch import deferred_layout
+from services.diagnostics import traced
+
+logger = logging.getLogger(__name__)
+
+EDID_HEADER = b"\x00\xff\xff\xff\xff\xff\xff\x00"
+
+def edid_ids(edid):
+    """"edid:" ids for one EDID blob: monitor name (if any), then MFG-product."""
+    if len(edid) < 128 or not edid.startswith(EDID_HEADER):
+        return []
+    ids = []
+    for offset in range(54, 126, 18):
+        block = edid[offset:offset + 18]
+        if block[:3] == b"\0\0\0" and block[3] == 0xFC:
+            name = block[5:].split(b"\n")[0].decode("ascii", "replace").strip()
+            if name:
+                ids.append(f"edid:{name}")
+    mfg = int.from_bytes(edid[8:10], "big")
+    letters = "".join(chr(64 + ((mfg >> shift) & 0x1F)) for shift in (10, 5, 0))
+    ids.append(f"edid:{letters}-{int.from_bytes(edid[10:12], 'little'):04X}")
+    return ids
+
+def read_outputs():
+    """Returns {(x, y): [ids]} for every lit RandR output, EDID ids first."""
+    import xcffib
+    import xcffib.randr
+    from xcffib.xproto import Atom
+    conn = xcffib.connect(display=os.environ.get("DISPLAY"))
+    try:
+        randr = conn(xcffib.randr.key)
+        root = conn.get_setup().roots[conn.pref_screen].root
+        res = randr.GetScreenResourcesCurrent(root).reply()
+        edid_atom = conn.core.InternAtom(True, 4, "EDID").reply().atom
+        outputs = {}
+        for output in res.outputs:
+            info = randr.GetOutputInfo(output, res.config_timestamp).reply()
+            if info.connection != xcffib.randr.Connection.Connected or not info.crtc:
+                continue
+            crtc = randr.GetCrtcInfo(info.crtc, res.config_timestamp).reply()
+            ids = []
+            if edid_atom:
+                prop = randr.GetOutputProperty(output, edid_atom, Atom.Any, 0, 64, False, False).reply()
+                ids = edid_ids(bytes(prop.data.buf()))
+            ids.append(bytes(info.name.buf()).decode())
+            outputs.setdefault((crtc.x, crtc.y), []).extend(ids)
+        return outputs
+    finally:
+        conn.disconnect()
+
+def affinity_plan(screen_ids, current, table):
+    """Picks a group per screen. screen_ids[i] are the output ids of screen i,
+    current[i] the group it shows; returns {screen_index: group_name} for the
+    screens that need to change."""
+    wanted = {}
+    for index, ids in enumerate(screen_ids):
+        key = next((i for i in ids if i in table), None)
+        if key is not None:
+            wanted[index] = list(table[key])
+    # screens already showing one of their groups keep it
+    taken = {current[i] for i, names in wanted.items() if current[i] in names}
+    plan = {}
+    for index, names in wanted.items():
+        if current[index] in names:
+            continue
+        free = [n for n in names if n not in taken]
+        if free:
+            plan[index] = free[0]
+            taken.add(free[0])
+    return plan
+
+@traced("group affinity")
+def apply_group_affinity(qtile_instance, table):
+    """Gives each screen not showing one of its groups its first free one,
+    with one deferred relayout for all the moves."""
+    if qtile_instance.core.name != "x11":
+        return
+    try:
+        by_position = read_outputs()
+    except Exception as e:
+        logger.warning(f"group affinity: can't read RandR outputs: {e}")
+        return
+    screens = qtile_instance.screens
+    plan = affinity_plan(
+        [by_position.get((s.x, s.y), []) for s in screens],
+        [s.group.name if s.group else None for s in screens], table)
+    plan = {i: name for i, name in plan.items() if name in qtile_instance.groups_map}
+    with deferred_layout(qtile_instance):
+        for index, name in plan.items():
+            screens[index].set_group(qtile_instance.groups_map[name], save_prev=False, warp=False)
+    if plan:
+        logger.info("group affinity: " + ", ".join(f"{name} -> screen {i}" for i, name in plan.items()))
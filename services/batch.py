@@ -0,0 +1,136 @@
+# Batched commands: external scripts (./qtile-batch) send a list of operations
+# over a unix socket and they run in one go, with one relayout per affected
+# group at the end. One JSON line each way:
+#   -> {"ops": [{"op": "togroup", "window": "focused", "group": "3"}, ...]}
+#   <- {"ok": true, "results": [...]}
+# Built-in ops:
+#   togroup  window=<wid|"focused"|{match kwargs}> group=<name>
+#   toscreen group=<name> screen=<index>
+#   layout   layout=<name> [group=<name>]
+# The config registers the rest (gaps, dump_log, stalls) with @batch_op.
+
+import asyncio
+import json
+import logging
+import os
+from contextlib import contextmanager
+
+from libqtile import qtile
+from libqtile.config import Match, ScratchPad
+
+from services.diagnostics import trace_span
+from services.termpool import POOL_GROUP
+
+logger = logging.getLogger(__name__)
+
+BATCH_SOCKET = os.environ.get('QTILE_BATCH_SOCKET') or os.path.join(
+    os.environ.get('XDG_RUNTIME_DIR') or os.path.expanduser('~/.cache/qtile'), 'qtile-batch.sock')
+
+OPS = {}  # op name -> fn(qtile_instance, op) returning the op's JSON result
+
+def batch_op(name):
+    def register(fn):
+        OPS[name] = fn
+        return fn
+    return register
+
+@contextmanager
+def deferred_layout(qtile_instance):
+    """Within the block Group.layout_all() only marks the group dirty; every
+    dirty group that is on a screen is laid out once on exit, even if the
+    block raised. Nested blocks pass their dirty groups to the outer one."""
+    dirty = []
+    saved = []  # (group, its own layout_all when nested, else None)
+    try:
+        for group in qtile_instance.groups:
+            saved.append((group, group.__dict__.get('layout_all')))
+            group.layout_all = lambda warp=False, _g=group: dirty.append(_g)
+        yield dirty
+    finally:
+        for group, previous in saved:
+            if previous is None:
+                del group.layout_all
+            else:
+                group.layout_all = previous
+        for group in dict.fromkeys(dirty):
+            if group.screen:
+                group.layout_all()
+
+def is_user_window(win):
+    """In a normal group: not unmanaged/static, and not parked in a ScratchPad
+    (the terminal pool, dropdowns), whose windows must not be picked directly."""
+    group = getattr(win, 'group', None)
+    if group is None or group.name == POOL_GROUP:
+        return False
+    return not any(isinstance(g, ScratchPad) and g.name == group.name for g in qtile.config.groups)
+
+def _batch_windows(qtile_instance, spec):
+    if spec == "focused":
+        win = qtile_instance.current_window
+        return [win] if win is not None and is_user_window(win) else []
+    if isinstance(spec, int):
+        win = qtile_instance.windows_map.get(spec)
+        return [win] if win is not None and is_user_window(win) else []
+    match = Match(**spec)
+    return [w for w in qtile_instance.windows_map.values() if is_user_window(w) and match.compare(w)]
+
+@batch_op("togroup")
+def _togroup(qtile_instance, op):
+    windows = _batch_windows(qtile_instance, op["window"])
+    for win in windows:
+        win.togroup(op["group"])
+    return len(windows)
+
+@batch_op("toscreen")
+def _toscreen(qtile_instance, op):
+    qtile_instance.screens[op["screen"]].set_group(qtile_instance.groups_map[op["group"]], warp=False)
+    return True
+
+@batch_op("layout")
+def _layout(qtile_instance, op):
+    group = qtile_instance.groups_map[op["group"]] if "group" in op else qtile_instance.current_group
+    group.layout = op["layout"]
+    return group.layout.name
+
+def run_batch(qtile_instance, ops):
+    """Runs ops in order; a failing op is reported and the rest still run."""
+    results = []
+    with trace_span("batch", ops=len(ops)), deferred_layout(qtile_instance):
+        for op in ops:
+            try:
+                kind = op.get("op")
+                if kind not in OPS:
+                    raise ValueError(f"unknown op {kind!r}")
+                results.append({"ok": True, "result": OPS[kind](qtile_instance, op)})
+            except Exception as e:
+                results.append({"ok": False, "error": f"{type(e).__name__}: {e}"})
+    return {"ok": all(r["ok"] for r in results), "results": results}
+
+async def _handle_client(reader, writer):
+    try:
+        while line := await reader.readline():
+            try:
+                reply = run_batch(qtile, json.loads(line)["ops"])
+            except (ValueError, KeyError, TypeError) as e:
+                reply = {"ok": False, "error": f"bad request: {e}"}
+            writer.write(json.dumps(reply).encode() + b"\n")
+            await writer.drain()
+    finally:
+        writer.close()
+
+async def start_server():
+    """Serves BATCH_SOCKET, once per process: the server outlives reloads."""
+    global server
+    if globals().get('server') is not None:
+        return
+    if os.path.exists(BATCH_SOCKET):
+        os.unlink(BATCH_SOCKET)
+    os.makedirs(os.path.dirname(BATCH_SOCKET), exist_ok=True)
+    # bound owner-only from the start: chmod afterwards leaves a window in
+    # which anyone can connect (the fallback path is under ~/.cache)
+    umask = os.umask(0o077)
+    try:
+        server = await asyncio.start_unix_server(_handle_client, path=BATCH_SOCKET)
+    finally:
+        os.umask(umask)
+    logger.info(f"batch command socket at {BATCH_SOCKET}")
@@ -0,0 +1,169 @@
+# Known Bluetooth devices from BlueZ on the system bus, kept current from its
+# signals so the picker and the bar widget never run bluetoothctl; connect,
+# disconnect and power are async D-Bus calls.
+
+import asyncio
+import logging
+
+from libqtile import qtile
+
+import dbus_compat
+
+logger = logging.getLogger(__name__)
+
+BLUEZ = "org.bluez"
+BLUEZ_ADAPTER = "org.bluez.Adapter1"
+BLUEZ_DEVICE = "org.bluez.Device1"
+BLUEZ_BATTERY = "org.bluez.Battery1"
+DBUS_PROPERTIES = "org.freedesktop.DBus.Properties"
+DBUS_OBJECT_MANAGER = "org.freedesktop.DBus.ObjectManager"
+class BluetoothInventory:
+    def __init__(self, widget_name, notify):
+        self.widget_name = widget_name  # the bar widget showing self.status
+        self.notify = notify  # notify(summary, body) for failed actions
+        self.available = False
+        self.adapters = {}  # object path -> powered
+        self.devices = {}   # object path -> {"name", "address", "paired", "connected", "battery", "busy"}
+        self.status = "BT: ..."  # bar text, rebuilt on the event loop after every change
+        self._dbus = None
+        self._bus = None
+        self._tasks = set()
+
+    async def start(self):
+        self._dbus = dbus_compat.library()
+        if self._dbus is None:
+            return  # dbus_compat has logged it; the widget uses bluetoothctl
+        try:
+            self._bus = await self._dbus.aio.MessageBus(bus_type=self._dbus.BusType.SYSTEM).connect()
+            for rule in (f"type='signal',sender='{BLUEZ}',interface='{DBUS_OBJECT_MANAGER}'",
+                         f"type='signal',sender='{BLUEZ}',interface='{DBUS_PROPERTIES}',member='PropertiesChanged'"):
+                await self._call("org.freedesktop.DBus", "/org/freedesktop/DBus", "org.freedesktop.DBus", "AddMatch", "s", [rule])
+            self._bus.add_message_handler(self._on_message)
+            reply = await self._call(BLUEZ, "/", DBUS_OBJECT_MANAGER, "GetManagedObjects")
+        except Exception as e:
+            logger.warning(f"bluetooth inventory unavailable ({e}), using bluetoothctl")
+            return
+        for path, interfaces in reply.body[0].items():
+            self._add(path, interfaces)
+        self.available = True
+        logger.info(f"bluetooth inventory: {len(self.devices)} known device(s)")
+        self._changed()
+
+    async def _call(self, destination, path, interface, member, signature="", body=()):
+        reply = await self._bus.call(self._dbus.Message(
+            destination=destination, path=path, interface=interface, member=member,
+            signature=signature, body=list(body),
+        ))
+        if reply.message_type == self._dbus.MessageType.ERROR:
+            raise RuntimeError(reply.body[0] if reply.body else reply.error_name)
+        return reply
+
+    # -- inventory (event loop) ------------------------------------------
+    @staticmethod
+    def _update_device(device, props):
+        for key, field in (("Address", "address"), ("Paired", "paired"), ("Connected", "connected")):
+            if key in props:
+                device[field] = props[key].value
+        name = props.get("Alias") or props.get("Name")
+        if name is not None:
+            device["name"] = name.value
+
+    def _add(self, path, interfaces):
+        if BLUEZ_ADAPTER in interfaces and "Powered" in interfaces[BLUEZ_ADAPTER]:
+            self.adapters[path] = interfaces[BLUEZ_ADAPTER]["Powered"].value
+        if BLUEZ_DEVICE in interfaces:
+            device = self.devices.setdefault(path, {
+                "name": None, "address": None, "paired": False, "connected": False, "battery": None, "busy": None,
+            })
+            self._update_device(device, interfaces[BLUEZ_DEVICE])
+        if BLUEZ_BATTERY in interfaces and path in self.devices and "Percentage" in interfaces[BLUEZ_BATTERY]:
+            self.devices[path]["battery"] = interfaces[BLUEZ_BATTERY]["Percentage"].value
+
+    def _on_message(self, msg):
+        if msg.member == "InterfacesAdded":
+            self._add(*msg.body)
+        elif msg.member == "InterfacesRemoved":
+            path, names = msg.body
+            if BLUEZ_DEVICE in names:
+                self.devices.pop(path, None)
+            elif BLUEZ_BATTERY in names and path in self.devices:
+                self.devices[path]["battery"] = None
+            if BLUEZ_ADAPTER in names:
+                self.adapters.pop(path, None)
+        elif msg.member == "PropertiesChanged" and msg.interface == DBUS_PROPERTIES:
+            interface, changed, _ = msg.body
+            if interface == BLUEZ_ADAPTER and "Powered" in changed:
+                self.adapters[msg.path] = changed["Powered"].value
+            elif interface == BLUEZ_DEVICE and msg.path in self.devices:
+                self._update_device(self.devices[msg.path], changed)
+            elif interface == BLUEZ_BATTERY and msg.path in self.devices and "Percentage" in changed:
+                self.devices[msg.path]["battery"] = changed["Percentage"].value
+            else:
+                return
+        else:
+            return
+        self._changed()
+
+    def _changed(self):
+        busy = next((d["busy"] for d in self.devices.values() if d["busy"]), None)
+        connected = [d for d in self.devices.values() if d["connected"]]
+        if busy:
+            self.status = f"BT: {busy}..."
+        elif not any(self.adapters.values()):
+            self.status = "BT: Off"
+        elif connected:
+            self.status = "BT: " + ", ".join(
+                d["name"] + (f" {d['battery']}%" if d["battery"] is not None else "") for d in connected)
+        else:
+            self.status = "BT: On"
+        widget = qtile.widgets_map.get(self.widget_name)
+        if widget is not None:
+            widget.update(self.status)
+
+    # -- actions (event loop) --------------------------------------------
+    def _spawn(self, coro):
+        task = asyncio.ensure_future(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    @staticmethod
+    def describe(device):
+        label = f"{'●' if device['connected'] else '○'} {device['name'] or '?'}  {device['address'] or ''}"
+        if device["battery"] is not None:
+            label += f"  {device['battery']}%"
+        return label if device["paired"] else label + "  (not paired)"
+
+    def toggle(self, path):
+        """Connects (pairing first if needed) or disconnects a device."""
+        device = self.devices.get(path)
+        if device is None or device["busy"]:
+            return
+        if device["connected"]:
+            steps, device["busy"] = ["Disconnect"], f"disconnecting {device['name']}"
+        else:
+            steps = ["Connect"] if device["paired"] else ["Pair", "Connect"]
+            device["busy"] = f"connecting {device['name']}"
+        self._changed()
+        self._spawn(self._run_steps(path, steps))
+
+    async def _run_steps(self, path, steps):
+        name = self.devices[path]["name"]
+        try:
+            for step in steps:
+                await self._call(BLUEZ, path, BLUEZ_DEVICE, step)
+        except Exception as e:
+            self.notify("Bluetooth", f"{step} {name} failed: {e}")
+        finally:
+            if path in self.devices:
+                self.devices[path]["busy"] = None
+            self._changed()
+
+    def set_powered(self, powered):
+        async def run():
+            try:
+                for path in list(self.adapters):
+                    await self._call(BLUEZ, path, DBUS_PROPERTIES, "Set", "ssv",
+                                     [BLUEZ_ADAPTER, "Powered", self._dbus.Variant("b", powered)])
+            except Exception as e:
+                self.notify("Bluetooth", f"Power {'on' if powered else 'off'} failed: {e}")
+        self._spawn(run())
@@ -0,0 +1,267 @@
+# Logging pipeline, tracing (QTILE_TRACE) and the event loop stall watchdog
+# (QTILE_STALL_WATCHDOG).
+
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+from contextlib import nullcontext
+
+from libqtile import bar, hook, qtile
+
+logger = logging.getLogger(__name__)
+
+# ---------------------------------------------------------------------------
+# Logging: records go on a queue; a listener thread writes them to qtile's log
+# handlers and a ring buffer, with repeats of a message rate limited.
+# ---------------------------------------------------------------------------
+LOG_RING_SIZE = 2000
+LOG_QUEUE_SIZE = 10000
+LOG_RATE_BURST = 5
+LOG_RATE_INTERVAL = 10  # seconds
+LOG_DUMP_FILE = os.path.expanduser('~/.cache/qtile/config-log.txt')
+
+class RateLimitFilter(logging.Filter):
+    def __init__(self, burst=LOG_RATE_BURST, interval=LOG_RATE_INTERVAL):
+        super().__init__()
+        self.burst = burst
+        self.interval = interval
+        self._sites = {}  # (file, line, message) -> [window start, count, suppressed]
+
+    def filter(self, record):
+        now = time.monotonic()
+        key = (record.pathname, record.lineno, record.getMessage())
+        site = self._sites.get(key)
+        if site is None or now - site[0] >= self.interval:
+            if len(self._sites) >= LOG_QUEUE_SIZE:
+                self._sites = {k: v for k, v in self._sites.items() if now - v[0] < self.interval}
+            self._sites[key] = [now, 1, 0]
+            if site and site[2]:
+                record.msg = f"{record.getMessage()} (suppressed {site[2]} repeats)"
+                record.args = None
+            return True
+        site[1] += 1
+        if site[1] <= self.burst:
+            return True
+        site[2] += 1
+        return False
+
+class RingBufferHandler(logging.Handler):
+    def __init__(self, size=LOG_RING_SIZE):
+        super().__init__()
+        self.lines = deque(maxlen=size)
+
+    def emit(self, record):
+        self.lines.append(self.format(record))
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that counts, rather than raises on, a full queue."""
+    dropped = 0
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+class LogPipeline:
+    def __init__(self):
+        self.ring = RingBufferHandler()
+        self.ring.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(funcName)s(): %(message)s"))
+        # write wherever qtile itself logs (qtile.log), stderr if it has no handlers yet
+        targets = list(logging.getLogger("libqtile").handlers) or [logging.StreamHandler()]
+        self.handler = DroppingQueueHandler(queue.Queue(LOG_QUEUE_SIZE))
+        self.handler.addFilter(RateLimitFilter())
+        self.listener = logging.handlers.QueueListener(
+            self.handler.queue, self.ring, *targets, respect_handler_level=True,
+        )
+        self.listener.start()
+
+    def attach(self, *names):
+        for name in names:
+            target = logging.getLogger(name)
+            if self.handler not in target.handlers:
+                target.addHandler(self.handler)
+            target.propagate = False
+            target.setLevel(logging.INFO)
+
+    def dump(self, path=LOG_DUMP_FILE):
+        lines = list(self.ring.lines)
+        if self.handler.dropped:
+            lines.append(f"({self.handler.dropped} records dropped on a full queue)")
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w') as f:
+            f.write("\n".join(lines) + "\n")
+        return len(lines)
+
+# ---------------------------------------------------------------------------
+# Tracing: QTILE_TRACE=/path/trace.json records spans in Chrome trace format
+# (open it in ui.perfetto.dev). Unset, trace_span() and traced() cost nothing.
+# ---------------------------------------------------------------------------
+_NO_SPAN = nullcontext()
+
+class Tracer:
+    def __init__(self, path):
+        self.path = path
+        self.pid = os.getpid()
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        # JSON array format: viewers accept the array without its closing
+        # bracket, so events are appended as they happen
+        self._file = open(path, 'w')
+        self._file.write("[\n")
+        self._emit({"name": "process_name", "ph": "M", "pid": self.pid, "args": {"name": "qtile config"}})
+
+    def _emit(self, event):
+        with self._lock:
+            self._file.write(json.dumps(event) + ",\n")
+
+    def flush(self):
+        with self._lock:
+            self._file.flush()
+
+    @staticmethod
+    def _us(t):
+        return int(t * 1_000_000)
+
+    def complete(self, name, start, end=None, **args):
+        end = time.perf_counter() if end is None else end
+        self._emit({
+            "name": name, "ph": "X", "pid": self.pid, "tid": threading.get_ident(),
+            "ts": self._us(start), "dur": self._us(end) - self._us(start), "args": args,
+        })
+
+    def instant(self, name, **args):
+        self._emit({
+            "name": name, "ph": "i", "s": "p", "pid": self.pid, "tid": threading.get_ident(),
+            "ts": self._us(time.perf_counter()), "args": args,
+        })
+
+    def span(self, name, args):
+        return _TraceSpan(self, name, args)
+
+class _TraceSpan:
+    def __init__(self, tracer, name, args):
+        self.tracer, self.name, self.args = tracer, name, args
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.tracer.complete(self.name, self.start, **self.args)
+
+# one trace file per qtile process, kept across config reloads
+if globals().get('tracer') is None:
+    tracer = Tracer(os.environ['QTILE_TRACE']) if os.environ.get('QTILE_TRACE') else None
+
+def trace_span(name, **args):
+    return tracer.span(name, args) if tracer else _NO_SPAN
+
+def traced(name):
+    def wrap(fn):
+        if tracer is None:
+            return fn
+
+        def run(*args, **kwargs):
+            with tracer.span(name, {}):
+                return fn(*args, **kwargs)
+        run.__name__ = fn.__name__
+        return run
+    return wrap
+
+def trace_widget_configure(widgets):
+    """Records a span per widget each time its bar configures it."""
+    if tracer is None:
+        return
+    for w in widgets:
+        def run(qtile_instance, bar_instance, _configure=w._configure, _name=w.name):
+            with tracer.span(f"configure {_name}", {}):
+                return _configure(qtile_instance, bar_instance)
+        w._configure = run
+
+# ---------------------------------------------------------------------------
+# Stall watchdog: a heartbeat on the event loop and a thread that logs the
+# loop thread's stack, and the key, hook or click being handled, when it is late.
+# ---------------------------------------------------------------------------
+STALL_THRESHOLD = float(os.environ.get('QTILE_STALL_WATCHDOG') or 0) / 1000
+
+class StallWatchdog:
+    def __init__(self, threshold=STALL_THRESHOLD):
+        self.threshold = threshold
+        self.interval = threshold / 2
+        self.label = None  # what the loop is handling, set by the wrappers below
+        self.stalls = 0
+        self.stalled_ms = 0  # summed over stalls that have ended
+        self._loop_thread = None
+        self._beat = None
+        self._stalled_since = None
+
+    def install(self):
+        """Wraps key, hook and bar click dispatch to keep self.label current.
+        Must run before bars are configured (they bind the click handler)."""
+        watchdog = self
+
+        def labelled(fn, describe):
+            def run(*args, **kwargs):
+                previous = watchdog.label
+                label = describe(*args)
+                watchdog.label = label if previous is None else f"{previous} > {label}"
+                try:
+                    return fn(*args, **kwargs)
+                finally:
+                    watchdog.label = previous
+            run.__name__ = fn.__name__
+            return run
+
+        def describe_key(keysym, mask):
+            key = qtile.keys_map.get((keysym, mask))
+            if key is None:
+                return "key press"
+            return f"key {'+'.join([*key.modifiers, key.key])} ({key.desc or 'no description'})"
+
+        def describe_click(bar_instance, x, y, button):
+            widget = bar_instance.get_widget_in_position(x, y)
+            return f"button {button} on {widget.name if widget else 'bar'}"
+
+        qtile.process_key_event = labelled(qtile.process_key_event, describe_key)
+        hook.fire = labelled(hook.fire, lambda event, *args: f"hook {event}")
+        bar.Bar.process_button_click = labelled(bar.Bar.process_button_click, describe_click)
+
+    def start(self):
+        self._loop_thread = threading.get_ident()
+        self._heartbeat()
+        threading.Thread(target=self._watch, name="stall-watchdog", daemon=True).start()
+        logger.info(f"stall watchdog: threshold {self.threshold * 1000:.0f} ms")
+
+    def _heartbeat(self):
+        now = time.monotonic()
+        if self._stalled_since is not None:
+            stalled_ms = (now - self._stalled_since) * 1000
+            self.stalled_ms += stalled_ms
+            logger.warning(f"event loop stall ended after {stalled_ms:.0f} ms")
+            self._stalled_since = None
+        self._beat = now
+        qtile.call_later(self.interval, self._heartbeat)
+
+    def _watch(self):
+        while True:
+            time.sleep(self.interval)
+            due = self._beat + self.interval
+            late = time.monotonic() - due
+            if late < self.threshold or self._stalled_since is not None:
+                continue
+            label = self.label or "an event loop callback"
+            frame = sys._current_frames().get(self._loop_thread)
+            stack = "".join(traceback.format_stack(frame)) if frame is not None else "  (no frame)\n"
+            self._stalled_since = due
+            self.stalls += 1
+            logger.warning(f"event loop stalled for {late * 1000:.0f} ms so far, in {label}; loop thread stack:\n{stack.rstrip()}")
+            if tracer:
+                tracer.instant("stall", label=label)
@@ -0,0 +1,83 @@
+# Debounced focus follows mouse: the window under the pointer is focused once
+# the pointer has rested on it for FOCUS_DWELL seconds or travelled
+# FOCUS_DISTANCE px inside it, instead of every window the pointer crosses.
+
+import logging
+import math
+import os
+import time
+
+from libqtile import qtile
+
+logger = logging.getLogger(__name__)
+
+try:
+    FOCUS_DWELL = float(os.environ.get('QTILE_FOCUS_DWELL') or 0.15)  # seconds, 0 for follow_mouse_focus
+except ValueError:
+    logger.warning(f"QTILE_FOCUS_DWELL={os.environ['QTILE_FOCUS_DWELL']!r} is not a number, using 0.15")
+    FOCUS_DWELL = 0.15
+FOCUS_DISTANCE = 120  # px
+FOCUS_POLL = 0.03  # pointer checks while a focus is pending
+
+class MouseFocus:
+    def __init__(self, dwell=FOCUS_DWELL, distance=FOCUS_DISTANCE):
+        self.dwell = dwell
+        self.distance = distance
+        self.pending = None
+        self.focus_events = 0
+        self._origin = None
+        self._since = 0
+        self._timer = None
+
+    @property
+    def enabled(self):
+        return self.dwell > 0
+
+    def cancel(self):
+        if self._timer is not None:
+            self._timer.cancel()
+        self._timer = None
+        self.pending = None
+
+    def entered(self, client):
+        if client is self.pending:
+            return
+        self.cancel()
+        if client is qtile.current_window or client.group is None:
+            return
+        self.pending = client
+        self._since = time.monotonic()
+        self._origin = qtile.core.get_mouse_position()
+        self._timer = qtile.call_later(min(FOCUS_POLL, self.dwell), self._check)
+
+    def focused(self, client):
+        """Any focus change, so a keyboard one drops a pending mouse focus."""
+        self.focus_events += 1
+        if client is not self.pending:
+            self.cancel()
+
+    def _under_pointer(self, client, x, y):
+        border = getattr(client, 'borderwidth', 0) * 2
+        return (client.x <= x < client.x + client.width + border
+                and client.y <= y < client.y + client.height + border)
+
+    def _check(self):
+        self._timer = None
+        client = self.pending
+        if client is None or client.group is None:
+            self.pending = None
+            return
+        x, y = qtile.core.get_mouse_position()
+        if not self._under_pointer(client, x, y):
+            self.pending = None  # left it again; the next window's enter takes over
+            return
+        travelled = math.hypot(x - self._origin[0], y - self._origin[1])
+        if time.monotonic() - self._since < self.dwell and travelled < self.distance:
+            self._timer = qtile.call_later(FOCUS_POLL, self._check)
+            return
+        # what qtile's own follow_mouse_focus does on EnterNotify
+        group = client.group
+        if group.current_window is not client:
+            group.focus(client, False)
+        if group.screen and qtile.current_screen is not group.screen:
+            qtile.focus_screen(group.screen.index, False)
@@ -0,0 +1,230 @@
+# Partial config reloads: the config file is split at its section banners and
+# compared with the text it was last run from. The config is re-run in place
+# (hooks subscribed by that run are dropped, the existing ones stay), then its
+# HOT_RELOAD_SECTIONS and HOT_RELOAD_CONSTANTS say what to redo: re-grab keys
+# or mouse, re-theme layouts, rebuild bars. Anything else is reload_config().
+
+import logging
+import os
+import re
+import time
+
+from libqtile import hook, qtile
+from libqtile.config import ScratchPad
+from libqtile.widget import base
+
+from services.batch import deferred_layout
+from services.inotify import IN_CLOSE_WRITE, IN_MOVED_TO, InotifyWatcher
+
+logger = logging.getLogger(__name__)
+
+CONFIG_WATCH_DELAY = 0.3  # editors often write in several steps
+
+_SECTION_BANNER = re.compile(r"^# -{20,}\n# (?!-)([^\n]*)\n", re.M)
+_ASSIGNMENT = re.compile(r"^([A-Za-z_]\w*)\s*=", re.M)
+
+def split_sections(source):
+    """{section title: text}; the title is the banner's first line up to any
+    ':' and the text before the first banner is filed under ""."""
+    sections = {}
+    starts = [(m.start(), m.group(1).split(':')[0].strip()) for m in _SECTION_BANNER.finditer(source)]
+    bounds = [(0, "")] + starts
+    for (start, title), (end, _) in zip(bounds, bounds[1:] + [(len(source), None)]):
+        sections[title] = sections.get(title, "") + source[start:end]
+    return sections
+
+def read_sections(path):
+    with open(path) as f:
+        return split_sections(f.read())
+
+def _hook_snapshot():
+    """A copy of hook.subscriptions, which is {event: [funcs]} up to qtile
+    0.23 and {registry name: {event: [funcs]}} since 0.24; None if it is
+    neither, and hooks can't be kept across a partial reload."""
+    snapshot = {}
+    for name, value in hook.subscriptions.items():
+        if isinstance(value, list):
+            snapshot[name] = list(value)
+        elif isinstance(value, dict) and all(isinstance(funcs, list) for funcs in value.values()):
+            snapshot[name] = {event: list(funcs) for event, funcs in value.items()}
+        else:
+            return None
+    return snapshot
+
+def _hook_lists():
+    """Every subscriber list in hook.subscriptions, in either layout."""
+    for value in hook.subscriptions.values():
+        yield from value.values() if isinstance(value, dict) else [value]
+
+def load_config_keep_hooks(qtile_instance):
+    """Re-runs the config, dropping the hooks it subscribes; False (and
+    nothing loaded) if the hooks can't be kept, so only a full reload works."""
+    saved = _hook_snapshot()
+    if saved is None:
+        return False
+    try:
+        qtile_instance.config.load()
+        qtile_instance.config.validate()
+    finally:
+        hook.subscriptions.clear()
+        hook.subscriptions.update(saved)
+    return True
+
+def _owned_by(func, objects):
+    owner = getattr(func, "__self__", None)
+    if owner is not None:
+        return id(owner) in objects
+    return any(id(cell.cell_contents) in objects for cell in getattr(func, "__closure__", None) or ())
+
+def regrab_keys(qtile_instance):
+    qtile_instance.ungrab_keys()
+    qtile_instance.chord_stack.clear()
+    for key in qtile_instance.config.keys:
+        qtile_instance.grab_key(key)
+
+def regrab_mouse(qtile_instance):
+    qtile_instance.core.ungrab_buttons()
+    qtile_instance._mouse_map.clear()
+    for button in qtile_instance.config.mouse:
+        qtile_instance.grab_button(button)
+
+def _regular_groups(qtile_instance):
+    names = {g.name for g in qtile_instance.config.groups if not isinstance(g, ScratchPad)}
+    return [g for g in qtile_instance.groups if g.name in names]
+
+def retheme_layouts(qtile_instance, layout_theme):
+    """Copies layout_theme values from the new config's layouts onto each
+    group's; False if the layout list itself changed."""
+    fresh = qtile_instance.config.layouts
+    groups = _regular_groups(qtile_instance)
+    if any([l.name for l in g.layouts] != [l.name for l in fresh] for g in groups):
+        return False
+    with deferred_layout(qtile_instance):
+        for group in groups:
+            for lyt, new in zip(group.layouts, fresh):
+                for key in layout_theme:
+                    setattr(lyt, key, getattr(new, key))
+            for key in layout_theme:
+                if hasattr(group.floating_layout, key):
+                    setattr(group.floating_layout, key, getattr(qtile_instance.config.floating_layout, key))
+            group.layout_all()
+    return True
+
+def rebuild_bars(qtile_instance):
+    """Swaps every screen's bars for the new config's, keeping the Screen
+    objects (and so their groups) in place; False if the old widgets' hooks
+    can't be found, so only a full reload works."""
+    if _hook_snapshot() is None:
+        return False
+    old = [*qtile_instance.widgets_map.values(), *(g for s in qtile_instance.screens for g in s.gaps)]
+    for obj in old:
+        try:
+            obj.finalize()
+        except Exception:
+            logger.exception(f"hot reload: finalizing {obj!r}")
+    doomed = {id(obj) for obj in old}
+    for funcs in _hook_lists():
+        funcs[:] = [f for f in funcs if not _owned_by(f, doomed)]
+    qtile_instance.widgets_map.clear()
+    base._Widget.global_defaults = qtile_instance.config.widget_defaults
+    configured = qtile_instance.config.screens
+    with deferred_layout(qtile_instance):
+        for index, screen in enumerate(qtile_instance.screens):
+            new = configured[index] if index < len(configured) else None
+            for side in ("top", "bottom", "left", "right"):
+                setattr(screen, side, getattr(new, side, None))
+            for gap in screen.gaps:
+                gap._configure(qtile_instance, screen, reconfigure=True)
+            if new is not None:
+                configured[index] = screen
+            screen.group.layout_all()
+    return True
+
+def apply_actions(qtile_instance, actions, layout_theme):
+    """Runs the partial reload steps; False means a full reload is needed."""
+    if "keys" in actions:
+        regrab_keys(qtile_instance)
+    if "mouse" in actions:
+        regrab_mouse(qtile_instance)
+    if "layouts" in actions and not retheme_layouts(qtile_instance, layout_theme):
+        return False
+    if "bar" in actions and not rebuild_bars(qtile_instance):
+        return False
+    return True
+
+def hot_reload(qtile_instance, config):
+    """Reloads what changed in config, the config module: it provides
+    config_sections (from read_sections), HOT_RELOAD_SECTIONS,
+    HOT_RELOAD_CONSTANTS, layout_theme and notifier."""
+    path = os.path.abspath(config.__file__)
+    try:
+        with open(path) as f:
+            source = f.read()
+        compile(source, path, 'exec')
+    except (OSError, SyntaxError) as e:
+        logger.warning(f"hot reload: not reloading, {e}")
+        config.notifier.notify("Qtile config", f"Not reloaded: {e}", tag="hot-reload")
+        return
+    old, new = config.config_sections, split_sections(source)
+    changed = [t for t in dict.fromkeys([*old, *new]) if old.get(t) != new.get(t)]
+    if not changed:
+        return
+    if any(config.HOT_RELOAD_SECTIONS.get(t) is None for t in changed):
+        logger.info(f"hot reload: full reload for {', '.join(changed)}")
+        qtile_instance.reload_config()
+        return
+    start = time.perf_counter()
+    actions = set().union(*(config.HOT_RELOAD_SECTIONS[t] for t in changed))
+    names = set(_ASSIGNMENT.findall(old.get("Constants", "")))
+    before = {name: vars(config).get(name) for name in names}
+    try:
+        kept_hooks = load_config_keep_hooks(qtile_instance)
+    except Exception as e:
+        logger.exception("hot reload: config error")
+        config.notifier.notify("Qtile config", f"Not reloaded: {e}", tag="hot-reload")
+        return
+    if not kept_hooks:
+        logger.info(f"hot reload: full reload for {', '.join(changed)} (unknown hook layout)")
+        qtile_instance.reload_config()
+        return
+    if "constants" in actions:
+        names |= set(_ASSIGNMENT.findall(new.get("Constants", "")))
+        for name in names:
+            if before.get(name) != vars(config).get(name):
+                if name not in config.HOT_RELOAD_CONSTANTS:
+                    actions = None
+                    break
+                actions |= config.HOT_RELOAD_CONSTANTS[name]
+        else:
+            actions.discard("constants")
+    if actions is None or not apply_actions(qtile_instance, actions, config.layout_theme):
+        logger.info(f"hot reload: full reload for {', '.join(changed)}")
+        qtile_instance.reload_config()
+        return
+    logger.info(f"hot reload: {', '.join(changed)} -> {', '.join(sorted(actions)) or 'nothing'} "
+                f"in {(time.perf_counter() - start) * 1000:.1f} ms")
+
+def watch(config):
+    """Hot reloads config whenever its file is saved. The watcher is started
+    once per process and outlives reloads."""
+    global watcher
+    if globals().get('watcher') is not None:
+        return
+    path = os.path.abspath(config.__file__)
+
+    def changed(directory, name, mask):
+        if directory is None or name == os.path.basename(path):
+            # from the watcher thread: hand over to the event loop, coalescing bursts
+            qtile.call_soon_threadsafe(_schedule, config)
+    try:
+        watcher = InotifyWatcher(changed, name="config-inotify")
+        watcher.watch(os.path.dirname(path), IN_CLOSE_WRITE | IN_MOVED_TO)
+        watcher.start()
+    except (OSError, AttributeError) as e:
+        logger.warning(f"config watcher unavailable: {e}")
+
+def _schedule(config):
+    global _timer
+    if globals().get('_timer') is not None:
+        _timer.cancel()
+    _timer = qtile.call_later(CONFIG_WATCH_DELAY, hot_reload, qtile, config)
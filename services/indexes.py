@@ -0,0 +1,433 @@
+# In-memory indexes kept current by inotify: executables on $PATH (spawncmd
+# completion and installed-tool checks), .desktop entries (the launcher) and
+# the handler xdg-open would pick per MIME type (bar launchers).
+
+import json
+import logging
+import mimetypes
+import os
+import shlex
+import shutil
+import threading
+import time
+
+from services.inotify import (
+    IN_CLOSE_WRITE, IN_CREATE, IN_DELETE, IN_DELETE_SELF, IN_DIR_CHANGES, IN_MOVE_SELF, IN_MOVED_FROM,
+    InotifyWatcher,
+)
+from services.worker import run_blocking
+
+logger = logging.getLogger(__name__)
+
+CACHE_DIR = os.path.expanduser('~/.cache/qtile')
+
+# ---------------------------------------------------------------------------
+# Command index: executables on $PATH in a prefix trie, plus a usage table so
+# commands you actually run are offered first.
+# ---------------------------------------------------------------------------
+COMMAND_USAGE_FILE = os.path.join(CACHE_DIR, 'command-usage.json')
+COMMAND_USAGE_HALF_LIFE = 3 * 24 * 3600  # seconds
+
+class CommandIndex:
+    def __init__(self, path=None, usage_file=COMMAND_USAGE_FILE):
+        self.dirs = [os.path.expanduser(d) for d in (path or os.environ.get('PATH', '')).split(':') if d]
+        self.usage_file = usage_file
+        self.ready = threading.Event()
+        self._lock = threading.Lock()
+        self._trie = {}
+        self._where = {}   # command name -> set of PATH dirs providing it
+        self._usage = {}   # command name -> [count, last used timestamp]
+        self._watcher = None
+        self.listeners = []  # listener(name, present) when a command appears or goes, once ready
+
+    def start(self):
+        run_blocking(self._build, name="command-index")
+        return self
+
+    def _build(self):
+        start = time.perf_counter()
+        try:
+            with open(self.usage_file) as f:
+                self._usage = json.load(f)
+        except (OSError, ValueError):
+            self._usage = {}
+        try:
+            self._watcher = InotifyWatcher(self._on_change, name="command-index-inotify")
+        except (OSError, AttributeError) as e:
+            logger.warning(f"command index: inotify unavailable ({e}); index will not auto-update")
+        for d in self.dirs:
+            if self._watcher:
+                self._watcher.watch(d)
+            self._scan(d)
+        if self._watcher:
+            self._watcher.start()
+        self.ready.set()
+        logger.info(f"command index: {len(self._where)} executables in {(time.perf_counter() - start) * 1000:.1f} ms")
+
+    def _scan(self, d):
+        try:
+            entries = list(os.scandir(d))
+        except OSError:
+            return
+        for entry in entries:
+            if self._is_executable(entry.path):
+                self._add(entry.name, d)
+
+    @staticmethod
+    def _is_executable(path):
+        return os.access(path, os.X_OK) and not os.path.isdir(path)
+
+    def _on_change(self, directory, name, mask):
+        if directory is None:
+            for d in self.dirs:
+                self._scan(d)
+            return
+        if mask & (IN_DELETE_SELF | IN_MOVE_SELF):
+            for cmd in [c for c, dirs in self._where.items() if directory in dirs]:
+                self._remove(cmd, directory)
+        elif mask & (IN_DELETE | IN_MOVED_FROM) or not self._is_executable(os.path.join(directory, name)):
+            self._remove(name, directory)
+        else:
+            self._add(name, directory)
+
+    def _add(self, name, directory):
+        with self._lock:
+            new = name not in self._where
+            self._where.setdefault(name, set()).add(directory)
+            node = self._trie
+            for ch in name:
+                node = node.setdefault(ch, {})
+            node[""] = name
+        if new:
+            self._notify(name, True)
+
+    def _remove(self, name, directory):
+        with self._lock:
+            dirs = self._where.get(name)
+            if not dirs:
+                return
+            dirs.discard(directory)
+            if dirs:
+                return
+            del self._where[name]
+            path = [self._trie]
+            for ch in name:
+                path.append(path[-1].get(ch, {}))
+            path[-1].pop("", None)
+            # prune now-empty branches
+            for i in range(len(name), 0, -1):
+                if path[i]:
+                    break
+                del path[i - 1][name[i - 1]]
+        self._notify(name, False)
+
+    def _notify(self, name, present):
+        if self.ready.is_set():
+            for listener in self.listeners:
+                listener(name, present)
+
+    def has(self, name):
+        with self._lock:
+            return name in self._where
+
+    def _score(self, name, now):
+        count, last = self._usage.get(name, (0, 0))
+        return count * 0.5 ** ((now - last) / COMMAND_USAGE_HALF_LIFE)
+
+    def complete(self, prefix):
+        """All indexed commands starting with prefix, most used first."""
+        with self._lock:
+            node = self._trie
+            for ch in prefix:
+                node = node.get(ch)
+                if node is None:
+                    return []
+            found = []
+            stack = [node]
+            while stack:
+                node = stack.pop()
+                for key, child in node.items():
+                    if key:
+                        stack.append(child)
+                    else:
+                        found.append(child)
+        now = time.time()
+        return sorted(found, key=lambda n: (-self._score(n, now), n))
+
+    def record(self, command):
+        name = command.split()[0] if command.strip() else ""
+        if not name:
+            return
+        with self._lock:
+            count, _ = self._usage.get(name, (0, 0))
+            self._usage[name] = [count + 1, time.time()]
+            usage = dict(self._usage)
+        try:
+            os.makedirs(os.path.dirname(self.usage_file), exist_ok=True)
+            with open(self.usage_file, 'w') as f:
+                json.dump(usage, f)
+        except OSError as e:
+            logger.warning(f"command index: cannot save usage: {e}")
+
+# ---------------------------------------------------------------------------
+# Installed tools, answered from the command index (shutil.which until it is
+# built), so widgets and bindings can say what is missing instead of running it.
+# ---------------------------------------------------------------------------
+class ToolProbe:
+    def __init__(self, index, names):
+        self.index = index
+        self.names = frozenset(names)
+        index.listeners.append(self._on_change)
+        missing = self.missing()
+        if missing:
+            logger.warning(f"tools not installed: {', '.join(missing)}")
+
+    def _on_change(self, name, present):
+        if name in self.names:
+            logger.info(f"tools: {name} {'found' if present else 'removed'}")
+
+    def has(self, name):
+        if os.path.dirname(name) or not self.index.ready.is_set():
+            return shutil.which(name) is not None
+        return self.index.has(name)
+
+    def missing(self):
+        return sorted(n for n in self.names if not self.has(n))
+
+    def first_missing(self, argv):
+        """First program in argv (including one run via `-e`) that isn't installed."""
+        programs = [argv[0]]
+        if "-e" in argv[:-1]:
+            programs.append(argv[argv.index("-e") + 1])
+        return next((p for p in programs if not self.has(p)), None)
+
+# ---------------------------------------------------------------------------
+# Desktop entries from the XDG application dirs, re-read per file on change.
+# ---------------------------------------------------------------------------
+DESKTOP_FIELD_CODES = ("%f", "%F", "%u", "%U", "%d", "%D", "%n", "%N", "%i", "%c", "%k", "%v", "%m")
+
+def _xdg_application_dirs():
+    data_home = os.environ.get('XDG_DATA_HOME') or os.path.expanduser('~/.local/share')
+    data_dirs = os.environ.get('XDG_DATA_DIRS') or '/usr/local/share:/usr/share'
+    # user dir first: it overrides system entries with the same desktop id
+    return [os.path.join(d, 'applications') for d in [data_home, *data_dirs.split(':')] if d]
+
+def parse_desktop_entry(path):
+    """Returns {"name", "exec", "terminal", "args", "mime_types"} or None for
+    hidden/non-app entries. "args" is whether Exec takes files/URLs."""
+    fields = {}
+    in_entry = False
+    try:
+        with open(path, encoding='utf-8', errors='replace') as f:
+            for line in f:
+                line = line.strip()
+                if line.startswith('['):
+                    if in_entry:
+                        break
+                    in_entry = line == '[Desktop Entry]'
+                elif in_entry and '=' in line and not line.startswith('#'):
+                    key, value = line.split('=', 1)
+                    fields.setdefault(key.strip(), value.strip())
+    except OSError:
+        return None
+    if (fields.get('Type') != 'Application' or 'Exec' not in fields or 'Name' not in fields
+            or fields.get('NoDisplay') == 'true' or fields.get('Hidden') == 'true'):
+        return None
+    command = fields['Exec']
+    takes_args = any(code in command for code in ("%f", "%F", "%u", "%U"))
+    for code in DESKTOP_FIELD_CODES:
+        command = command.replace(code, '')
+    return {
+        "name": fields['Name'],
+        "exec": " ".join(command.replace('%%', '%').split()),
+        "terminal": fields.get('Terminal') == 'true',
+        "args": takes_args,
+        "mime_types": tuple(t for t in fields.get('MimeType', '').split(';') if t),
+    }
+
+class DesktopEntryIndex:
+    def __init__(self, dirs=None):
+        self.dirs = dirs or _xdg_application_dirs()
+        self.ready = threading.Event()
+        self._lock = threading.Lock()
+        self._by_dir = {d: {} for d in self.dirs}  # app dir -> desktop id -> entry
+        self._by_id = None
+        self._merged = None
+        self.generation = 0  # bumped on every change, for caches built on the index
+
+    def start(self):
+        run_blocking(self._build, name="desktop-index")
+        return self
+
+    def _build(self):
+        start = time.perf_counter()
+        try:
+            self._watcher = InotifyWatcher(self._on_change, name="desktop-index-inotify")
+        except (OSError, AttributeError) as e:
+            self._watcher = None
+            logger.warning(f"desktop index: inotify unavailable ({e}); index will not auto-update")
+        for d in self.dirs:
+            self._scan(d)
+        if self._watcher:
+            self._watcher.start()
+        self.ready.set()
+        logger.info(f"desktop index: {len(self.entries())} entries in {(time.perf_counter() - start) * 1000:.1f} ms")
+
+    def _scan(self, app_dir, path=None):
+        for root, _, files in os.walk(path or app_dir):
+            if self._watcher:
+                self._watcher.watch(root, IN_DIR_CHANGES | IN_CLOSE_WRITE)
+            for name in files:
+                if name.endswith('.desktop'):
+                    self._update(app_dir, os.path.join(root, name))
+
+    def _update(self, app_dir, path):
+        desktop_id = os.path.relpath(path, app_dir).replace(os.sep, '-')
+        entry = parse_desktop_entry(path) if os.path.exists(path) else None
+        with self._lock:
+            if entry is None:
+                self._by_dir[app_dir].pop(desktop_id, None)
+            else:
+                entry["id"] = desktop_id
+                self._by_dir[app_dir][desktop_id] = entry
+            self._by_id = self._merged = None
+            self.generation += 1
+
+    def _on_change(self, directory, name, mask):
+        if directory is None:
+            for d in self.dirs:
+                self._scan(d)
+            return
+        app_dir = next((d for d in self.dirs if directory == d or directory.startswith(d + os.sep)), None)
+        if app_dir is None:
+            return
+        path = os.path.join(directory, name)
+        if mask & IN_CREATE and os.path.isdir(path):
+            self._scan(app_dir, path)
+        elif name.endswith('.desktop'):
+            self._update(app_dir, path)
+
+    def _merge(self):
+        if self._by_id is None:
+            merged = {}
+            for d in reversed(self.dirs):
+                merged.update(self._by_dir[d])
+            self._by_id = merged
+            self._merged = sorted(merged.values(), key=lambda e: e["name"].lower())
+
+    def entries(self):
+        """Visible entries sorted by name; earlier dirs win on duplicate ids."""
+        with self._lock:
+            self._merge()
+            return self._merged
+
+    def get(self, desktop_id):
+        with self._lock:
+            self._merge()
+            return self._by_id.get(desktop_id)
+
+# ---------------------------------------------------------------------------
+# URL / file handlers: what xdg-open would pick, from the mimeapps.list files
+# and the desktop index, cached until either changes.
+# ---------------------------------------------------------------------------
+def _mimeapps_lists():
+    config_home = os.environ.get('XDG_CONFIG_HOME') or os.path.expanduser('~/.config')
+    config_dirs = (os.environ.get('XDG_CONFIG_DIRS') or '/etc/xdg').split(':')
+    desktops = [d.lower() for d in os.environ.get('XDG_CURRENT_DESKTOP', '').split(':') if d]
+    paths = []
+    for d in [config_home, *config_dirs, *_xdg_application_dirs()]:
+        if d:
+            paths += [os.path.join(d, f"{desktop}-mimeapps.list") for desktop in desktops]
+            paths.append(os.path.join(d, 'mimeapps.list'))
+    return paths
+
+def parse_mimeapps_list(path):
+    """Returns {section: {mime type: [desktop ids]}}; empty if unreadable."""
+    sections = {}
+    current = None
+    try:
+        with open(path, encoding='utf-8', errors='replace') as f:
+            for line in f:
+                line = line.strip()
+                if line.startswith('['):
+                    current = sections.setdefault(line.strip('[]'), {})
+                elif current is not None and '=' in line and not line.startswith('#'):
+                    mime, ids = line.split('=', 1)
+                    current.setdefault(mime.strip(), []).extend(i for i in ids.strip().split(';') if i)
+    except OSError:
+        pass
+    return sections
+
+class MimeHandlerCache:
+    def __init__(self, index, terminal):
+        self.index = index
+        self.terminal = terminal  # runs entries with Terminal=true
+        self._lock = threading.Lock()
+        self._handlers = {}  # mime type -> entry or None
+        self._lists = None
+        self._generation = None
+        self._watcher = None
+
+    def start(self):
+        try:
+            self._watcher = InotifyWatcher(self._on_change, name="mimeapps-inotify")
+        except (OSError, AttributeError) as e:
+            logger.warning(f"mime handlers: inotify unavailable ({e}); cache only follows desktop entries")
+            return self
+        for d in dict.fromkeys(os.path.dirname(p) for p in _mimeapps_lists()):
+            if os.path.isdir(d):
+                self._watcher.watch(d, IN_DIR_CHANGES | IN_CLOSE_WRITE)
+        self._watcher.start()
+        return self
+
+    def _on_change(self, directory, name, mask):
+        if directory is None or name.endswith('mimeapps.list'):
+            with self._lock:
+                self._handlers.clear()
+                self._lists = None
+
+    def handler(self, mime):
+        """The desktop entry that opens mime, or None."""
+        with self._lock:
+            if self._generation != self.index.generation:
+                self._generation = self.index.generation
+                self._handlers.clear()
+            if mime in self._handlers:
+                return self._handlers[mime]
+            if self._lists is None:
+                self._lists = [parse_mimeapps_list(p) for p in _mimeapps_lists()]
+            lists = self._lists
+        entry = self._resolve(mime, lists)
+        with self._lock:
+            self._handlers[mime] = entry
+        return entry
+
+    def _resolve(self, mime, lists):
+        # mime-apps-spec: any installed default wins, then added associations
+        # not removed by a more important file, then any entry listing mime
+        for sections in lists:
+            for desktop_id in sections.get('Default Applications', {}).get(mime, []):
+                if (entry := self.index.get(desktop_id)) is not None:
+                    return entry
+        removed = set()
+        for sections in lists:
+            for desktop_id in sections.get('Added Associations', {}).get(mime, []):
+                if desktop_id not in removed and (entry := self.index.get(desktop_id)) is not None:
+                    return entry
+            removed.update(sections.get('Removed Associations', {}).get(mime, []))
+        return next((e for e in self.index.entries() if mime in e["mime_types"] and e["id"] not in removed), None)
+
+    def command(self, target):
+        """argv opening a URL or path with its handler, or None."""
+        scheme = target.split(':', 1)[0] if '://' in target or target.startswith('mailto:') else None
+        if scheme:
+            mime = f"x-scheme-handler/{scheme}"
+        elif os.path.isdir(target):
+            mime = "inode/directory"
+        else:
+            mime = mimetypes.guess_type(target)[0] or "application/octet-stream"
+        entry = self.handler(mime)
+        if entry is None:
+            return None
+        argv = shlex.split(entry["exec"]) + ([target] if entry["args"] else [])
+        return [self.terminal, "-e", *argv] if entry["terminal"] else argv
@@ -0,0 +1,81 @@
+# Minimal inotify(7) wrapper over libc, no extra dependencies.
+
+import ctypes
+import logging
+import os
+import select
+import struct
+import threading
+
+logger = logging.getLogger(__name__)
+
+# inotify(7) event bits
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_DIR_CHANGES = IN_ATTRIB | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE | IN_DELETE_SELF | IN_MOVE_SELF
+
+class InotifyWatcher:
+    """callback(directory, name, mask) runs on the watcher's daemon thread;
+    directory/name are None on queue overflow, meaning "rescan everything".
+    """
+    _EVENT = struct.Struct("iIII")
+
+    def __init__(self, callback, name="inotify"):
+        self.callback = callback
+        self.name = name
+        self._libc = ctypes.CDLL(None, use_errno=True)
+        self._fd = self._libc.inotify_init1(os.O_CLOEXEC | os.O_NONBLOCK)
+        if self._fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self._wds = {}
+        self._wake_r, self._wake_w = os.pipe()
+        self._thread = None
+
+    def watch(self, path, mask=IN_DIR_CHANGES):
+        wd = self._libc.inotify_add_watch(self._fd, os.fsencode(path), mask)
+        if wd < 0:
+            logger.debug(f"{self.name}: cannot watch {path}: {os.strerror(ctypes.get_errno())}")
+            return False
+        self._wds[wd] = path
+        return True
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        os.write(self._wake_w, b"x")
+
+    def _run(self):
+        while True:
+            ready, _, _ = select.select([self._fd, self._wake_r], [], [])
+            if self._wake_r in ready:
+                break
+            try:
+                data = os.read(self._fd, 64 * 1024)
+            except BlockingIOError:
+                continue
+            offset = 0
+            while offset < len(data):
+                wd, mask, _, length = self._EVENT.unpack_from(data, offset)
+                offset += self._EVENT.size
+                name = data[offset:offset + length].rstrip(b"\0").decode(errors="replace")
+                offset += length
+                directory = self._wds.get(wd)
+                if mask & IN_Q_OVERFLOW:
+                    directory = name = None
+                try:
+                    self.callback(directory, name, mask)
+                except Exception:
+                    logger.exception(f"{self.name}: callback failed")
+        for fd in (self._fd, self._wake_r, self._wake_w):
+            os.close(fd)
@@ -0,0 +1,107 @@
+# Launcher pieces: rofi -dmenu run as an asyncio subprocess, the window
+# switcher's most-recently-used history, and key-to-map timing of rofi's
+# window (QTILE_LAUNCHER_TIMING=1).
+
+import asyncio
+import logging
+import os
+import statistics
+import subprocess
+import threading
+import time
+from collections import OrderedDict
+
+from services.batch import is_user_window
+
+logger = logging.getLogger(__name__)
+
+timings = {}  # "dmenu:apps", "show:drun", ... -> [ms, ...]
+
+def time_first_map(label):
+    """Logs the time from now until the next override-redirect window maps."""
+    started = time.perf_counter()
+    try:
+        import xcffib
+        from xcffib.xproto import CW, EventMask, MapNotifyEvent
+        conn = xcffib.connect(display=os.environ.get("DISPLAY"))
+        root = conn.get_setup().roots[conn.pref_screen].root
+        conn.core.ChangeWindowAttributesChecked(root, CW.EventMask, [EventMask.SubstructureNotify]).check()
+    except Exception as e:
+        logger.warning(f"launcher timing unavailable: {e}")
+        return
+
+    def wait():
+        try:
+            while time.perf_counter() - started < 5:
+                event = conn.poll_for_event()
+                if event is None:
+                    time.sleep(0.001)
+                elif isinstance(event, MapNotifyEvent) and event.override_redirect:
+                    ms = (time.perf_counter() - started) * 1000
+                    samples = timings.setdefault(label, [])
+                    samples.append(ms)
+                    logger.info(f"launcher {label}: mapped in {ms:.1f} ms (median {statistics.median(samples):.1f} ms over {len(samples)})")
+                    return
+        finally:
+            conn.disconnect()
+    threading.Thread(target=wait, daemon=True).start()
+
+if globals().get('dmenu_tasks') is None:
+    dmenu_tasks = set()  # running rofi -dmenu calls, so they aren't collected
+
+def dmenu(labels, prompt, on_select, on_failure):
+    """Shows labels in rofi -dmenu. on_select(index, text) runs on the event
+    loop, index -1 for custom input; on_failure(reason) if rofi fails."""
+    # an asyncio subprocess, not an executor job: the menu stays open for as
+    # long as the user takes, which in single-worker mode would hold the only
+    # worker thread and stall every widget poll
+    async def run():
+        try:
+            proc = await asyncio.create_subprocess_exec(
+                'rofi', '-dmenu', '-i', '-p', prompt, '-format', 'i s',
+                stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+            )
+            stdout, _ = await proc.communicate("\n".join(labels).encode())
+        except OSError as e:
+            on_failure(f"failed ({e})")
+            return
+        stdout = stdout.decode(errors="replace")
+        if proc.returncode == 0 and stdout.strip():
+            index, _, text = stdout.rstrip("\n").partition(" ")
+            on_select(int(index), text)
+        elif proc.returncode > 1:  # 1 = dismissed, < 0 = killed
+            on_failure(f"exited {proc.returncode}")
+
+    task = asyncio.ensure_future(run())
+    dmenu_tasks.add(task)
+    task.add_done_callback(dmenu_tasks.discard)
+
+class WindowHistory:
+    """Most-recently-used order of every managed window on all groups and
+    screens, kept from the focus, managed and kill hooks, so the switcher
+    lists windows without asking X about each one."""
+
+    def __init__(self):
+        self._order = OrderedDict()  # wid -> window, least recent first
+
+    def add(self, win):
+        if is_user_window(win) and win.wid not in self._order:
+            self._order[win.wid] = win
+            self._order.move_to_end(win.wid, last=False)  # never focused yet
+
+    def touch(self, win):
+        if not is_user_window(win):
+            return
+        self._order[win.wid] = win
+        self._order.move_to_end(win.wid)
+
+    def forget(self, win):
+        self._order.pop(win.wid, None)
+
+    def windows(self, current=None):
+        """Most recent first and the current window last, so the first entry
+        is the window to go back to."""
+        windows = [w for w in reversed(self._order.values()) if is_user_window(w)]
+        if windows and windows[0] is current:
+            windows.append(windows.pop(0))
+        return windows
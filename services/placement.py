@@ -0,0 +1,115 @@
+# Map-time placement: a new window goes to its group (and that group to its
+# screen), floating or not, from client_new, before qtile adds it to the
+# current group, so it is laid out once, where it belongs.
+
+import logging
+import re
+import time
+
+from libqtile import qtile
+
+logger = logging.getLogger(__name__)
+
+PLACEMENT_EXPECT_TIMEOUT = 30  # s an expect()ed pid stays valid
+PLACEMENT_PID_DEPTH = 4  # ancestors checked for an expect()ed pid
+
+def parent_pid(pid):
+    try:
+        with open(f"/proc/{pid}/stat") as f:
+            stat = f.read()
+        # comm may contain spaces and parentheses; ppid is 2nd after the last ')'
+        return int(stat[stat.rindex(")") + 2:].split()[1])
+    except (OSError, ValueError, IndexError):
+        return 0
+
+class PlacementRules:
+    """Rules are tried in order; one matches on wm_class (instance or class,
+    case-insensitive) and/or a title regex and places with any of group,
+    screen (index to show the group on), float and switch (go to the group).
+    They are compiled into a dict keyed by wm_class plus one regex for the
+    title-only rules, so matching doesn't walk the whole table."""
+
+    def __init__(self, rules):
+        self.rules = [dict(rule) for rule in rules]
+        self.by_class = {}  # wm_class -> [(order, rule, title regex or None)]
+        title_only = []
+        for order, rule in enumerate(self.rules):
+            title = re.compile(rule["title"]) if rule.get("title") else None
+            if rule.get("wm_class"):
+                self.by_class.setdefault(rule["wm_class"].lower(), []).append((order, rule, title))
+            elif title is not None:
+                title_only.append((order, rule))
+        # one alternation, tried in table order: group r<i> is title_only[i];
+        # unanchored patterns get a lazy .*? so match() works like search()
+        self._title_rules = title_only
+        self._titles = re.compile("|".join(
+            f"(?P<r{i}>{'' if rule['title'].startswith('^') and '|' not in rule['title'] else '.*?'}(?:{rule['title']}))"
+            for i, (_, rule) in enumerate(title_only)), re.S) if title_only else None
+        self.pids = {}  # pid -> (placement, expiry)
+        self.tile_when_managed = set()  # wids of "float": False windows, see place()
+
+    def expect(self, pid, timeout=PLACEMENT_EXPECT_TIMEOUT, **placement):
+        """Places the next windows of pid (or of its children) like this,
+        whatever the rules say."""
+        now = time.monotonic()
+        self.pids = {p: v for p, v in self.pids.items() if v[1] > now}
+        self.pids[pid] = (placement, now + timeout)
+
+    def _expected(self, pid):
+        now = time.monotonic()
+        for _ in range(PLACEMENT_PID_DEPTH):
+            hit = self.pids.get(pid)
+            if hit is not None and hit[1] > now:
+                return hit[0]
+            pid = parent_pid(pid)
+            if pid <= 1:
+                return None
+        return None
+
+    def match(self, wm_class, title, pid=0):
+        """The placement for a window, or None."""
+        if pid and self.pids:
+            placement = self._expected(pid)
+            if placement is not None:
+                return placement
+        best = None
+        for name in wm_class or ():
+            for order, rule, title_re in self.by_class.get(name.lower(), ()):
+                if title_re is None or (title and title_re.search(title)):
+                    if best is None or order < best[0]:
+                        best = (order, rule)
+                    break
+        if title and self._titles is not None:
+            m = self._titles.match(title)
+            if m is not None:
+                order, rule = self._title_rules[int(m.lastgroup[1:])]
+                if best is None or order < best[0]:
+                    best = (order, rule)
+        return best[1] if best else None
+
+    def place(self, win):
+        """From client_new."""
+        if win.group is not None or not hasattr(win, "togroup"):
+            return  # already placed, e.g. a pooled terminal
+        wm_class = win.get_wm_class()
+        rule = self.match(wm_class, win.name, win.get_pid())
+        if rule is None:
+            return
+        if rule.get("float"):
+            win.floating = True  # before it has a group: no tiled layout first
+        elif "float" in rule:
+            self.tile_when_managed.add(win.wid)  # unfloating needs a group: see managed()
+        group = qtile.groups_map.get(rule.get("group"))
+        if group is not None:
+            screen = rule.get("screen")
+            if screen is not None and screen < len(qtile.screens) and group.screen is not qtile.screens[screen]:
+                qtile.screens[screen].set_group(group, warp=False)
+            win.togroup(group.name, switch_group=rule.get("switch", False))
+        logger.info(f"placement: {wm_class} {win.name!r} -> {rule}")
+
+    def managed(self, win):
+        """From client_managed: tiles "float": False windows, now in their group."""
+        if win.wid in self.tile_when_managed:
+            self.tile_when_managed.discard(win.wid)
+            if win.group is not None:
+                win.floating = False  # after the float rules have had their say
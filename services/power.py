@@ -0,0 +1,191 @@
+# Power policy: bar polling stretched on battery and paused while the screen
+# is blanked, the clock down to per-minute redraws in both. AC/battery comes
+# from sysfs, blanking from MIT-SCREEN-SAVER events plus DPMS.
+
+import asyncio
+import logging
+import os
+import statistics
+import threading
+import time
+
+from libqtile import qtile
+
+logger = logging.getLogger(__name__)
+
+POWER_SUPPLY_DIR = '/sys/class/power_supply'
+POWER_CHECK_INTERVAL = 30      # seconds between AC/DPMS checks
+POWER_LOW_BATTERY = 15         # percent
+POWER_POLL_FACTOR = {"ac": 1, "battery": 3, "low_battery": 6}
+POWER_PAUSED_INTERVAL = 24 * 3600
+CLOCK_FORMAT_SECONDS = "%m-%d-%y %a %I:%M:%S %p"
+CLOCK_FORMAT_MINUTES = "%m-%d-%y %a %I:%M %p"
+
+def read_power_supply(path=POWER_SUPPLY_DIR):
+    """(on_ac, battery percent or None); no battery at all counts as AC."""
+    on_ac, capacities = None, []
+    try:
+        supplies = os.listdir(path)
+    except OSError:
+        return True, None
+
+    def read(name, field):
+        try:
+            with open(os.path.join(path, name, field)) as f:
+                return f.read().strip()
+        except OSError:
+            return None
+    for name in supplies:
+        kind = read(name, 'type')
+        if kind == 'Mains':
+            on_ac = on_ac or read(name, 'online') == '1'
+        elif kind == 'Battery' and read(name, 'scope') != 'Device':
+            capacity = read(name, 'capacity')
+            if capacity and capacity.isdigit():
+                capacities.append(int(capacity))
+            if on_ac is None and read(name, 'status') in ('Charging', 'Full'):
+                on_ac = True
+    battery = min(capacities) if capacities else None
+    return (on_ac if on_ac is not None else battery is None), battery
+
+def _count_context_switches():
+    total = 0
+    try:
+        tasks = os.listdir('/proc/self/task')
+    except OSError:
+        return 0
+    for tid in tasks:
+        try:
+            with open(f'/proc/self/task/{tid}/status') as f:
+                for line in f:
+                    if 'ctxt_switches' in line:
+                        total += int(line.split()[-1])
+        except (OSError, ValueError):
+            pass
+    return total
+
+class PowerPolicy:
+    def __init__(self):
+        self.mode = None
+        self.wakeups = {}      # mode -> [wakeups per minute, ...]
+        self._paused = set()
+        self._wake = threading.Event()
+        self._blanked = False
+        self._conn = None
+        self.listeners = []  # listener(mode) after widgets are adjusted
+
+    def start(self):
+        threading.Thread(target=self._run, name="power-policy", daemon=True).start()
+        return self
+
+    def check_now(self):
+        self._wake.set()
+
+    def reapply(self):
+        """After a config reload: applies the current mode to the new widgets."""
+        self._paused.clear()
+        qtile.call_soon_threadsafe(self.apply)
+
+    # -- state -----------------------------------------------------------
+    def _connect_x(self):
+        try:
+            import xcffib
+            import xcffib.dpms
+            import xcffib.screensaver
+            conn = xcffib.connect(display=os.environ.get("DISPLAY"))
+            saver = conn(xcffib.screensaver.key)
+            root = conn.get_setup().roots[conn.pref_screen].root
+            saver.SelectInput(root, xcffib.screensaver.Event.NotifyMask)
+            conn.flush()
+            self._conn = conn
+            threading.Thread(target=self._watch_saver, name="power-policy-saver", daemon=True).start()
+        except Exception as e:
+            logger.info(f"power policy: no screensaver/DPMS info ({e}); using AC/battery only")
+
+    def _watch_saver(self):
+        import xcffib.screensaver
+        while True:
+            try:
+                event = self._conn.wait_for_event()
+            except Exception:
+                return
+            if isinstance(event, xcffib.screensaver.NotifyEvent):
+                self._blanked = event.state == xcffib.screensaver.State.On
+                self._wake.set()
+
+    def _dpms_off(self):
+        if self._conn is None:
+            return False
+        try:
+            import xcffib.dpms
+            info = self._conn(xcffib.dpms.key).Info().reply()
+            return bool(info.state) and info.power_level != xcffib.dpms.DPMSMode.On
+        except Exception:
+            return False
+
+    def current_mode(self):
+        if self._blanked or self._dpms_off():
+            return "idle"
+        on_ac, battery = read_power_supply()
+        if on_ac:
+            return "ac"
+        return "low_battery" if battery is not None and battery <= POWER_LOW_BATTERY else "battery"
+
+    def _run(self):
+        if os.environ.get("DISPLAY"):
+            self._connect_x()
+        minute_start, switches = time.monotonic(), _count_context_switches()
+        while True:
+            mode = self.current_mode()
+            if mode != self.mode:
+                logger.info(f"power policy: {self.mode} -> {mode}")
+                self.mode = mode
+                minute_start, switches = time.monotonic(), _count_context_switches()
+                qtile.call_soon_threadsafe(self.apply)
+            elif time.monotonic() - minute_start >= 60:
+                now, count = time.monotonic(), _count_context_switches()
+                per_minute = (count - switches) * 60 / (now - minute_start)
+                samples = self.wakeups.setdefault(mode, [])
+                samples.append(per_minute)
+                logger.info(f"power policy [{mode}]: {per_minute:.0f} wakeups/min (median {statistics.median(samples):.0f})")
+                minute_start, switches = now, count
+            self._wake.wait(POWER_CHECK_INTERVAL)
+            self._wake.clear()
+
+    # -- widgets (event loop thread) -------------------------------------
+    @staticmethod
+    def configured_interval(w):
+        """update_interval from the widget's config or defaults, never the
+        current value, which apply() scales and a partial reload keeps."""
+        found, interval = w._find_default('update_interval')
+        return interval if found and isinstance(interval, (int, float)) else w.update_interval
+
+    def apply(self):
+        loop = asyncio.get_running_loop()
+        for w in list(qtile.widgets_map.values()):
+            interval = getattr(w, 'update_interval', None)
+            if not isinstance(interval, (int, float)) or not hasattr(w, 'timer_setup'):
+                continue
+            base_interval = self.configured_interval(w)
+            is_clock = getattr(w, 'format', None) in (CLOCK_FORMAT_SECONDS, CLOCK_FORMAT_MINUTES)
+            if self.mode == "idle":
+                w.update_interval = POWER_PAUSED_INTERVAL
+            elif self.mode == "ac":
+                w.update_interval = base_interval
+            else:
+                w.update_interval = 60 if is_clock else base_interval * POWER_POLL_FACTOR[self.mode]
+            if is_clock:
+                w.format = CLOCK_FORMAT_SECONDS if self.mode == "ac" else CLOCK_FORMAT_MINUTES
+            # restart the widget's timer chain so the new interval applies now;
+            # a poll still in flight reschedules itself with the new interval
+            pending = [f for f in getattr(w, '_futures', [])
+                       if isinstance(f, asyncio.TimerHandle) and not f.cancelled() and f.when() > loop.time()]
+            for f in pending:
+                f.cancel()
+            if self.mode == "idle":
+                self._paused.add(w.name)
+            elif pending or w.name in self._paused:
+                self._paused.discard(w.name)
+                w.timer_setup()
+        for listener in self.listeners:
+            listener(self.mode)
@@ -0,0 +1,277 @@
+# Region screenshots to the clipboard, in process: rubber-band selection,
+# an MIT-SHM grab, PNG encoding and a CLIPBOARD owner serving the result.
+# X11 only; the config falls back to scrot | xclip elsewhere.
+
+import ctypes
+import io
+import logging
+import os
+import struct
+import threading
+import time
+import zlib
+
+logger = logging.getLogger(__name__)
+
+class _SysVShm:
+    """Just enough of shmget/shmat for an MIT-SHM segment."""
+    IPC_PRIVATE = 0
+    IPC_CREAT = 0o1000
+    IPC_RMID = 0
+
+    def __init__(self, size):
+        libc = ctypes.CDLL(None, use_errno=True)
+        libc.shmget.argtypes = [ctypes.c_int, ctypes.c_size_t, ctypes.c_int]
+        libc.shmat.argtypes = [ctypes.c_int, ctypes.c_void_p, ctypes.c_int]
+        libc.shmat.restype = ctypes.c_void_p
+        libc.shmdt.argtypes = [ctypes.c_void_p]
+        libc.shmctl.argtypes = [ctypes.c_int, ctypes.c_int, ctypes.c_void_p]
+        self._libc = libc
+        self.size = size
+        self.shmid = libc.shmget(self.IPC_PRIVATE, size, self.IPC_CREAT | 0o600)
+        if self.shmid < 0:
+            raise OSError(ctypes.get_errno(), "shmget failed")
+        self.addr = libc.shmat(self.shmid, None, 0)
+        if self.addr in (None, ctypes.c_void_p(-1).value):
+            libc.shmctl(self.shmid, self.IPC_RMID, None)
+            raise OSError(ctypes.get_errno(), "shmat failed")
+
+    def mark_removed(self):
+        # segment is freed once both we and the X server have detached
+        self._libc.shmctl(self.shmid, self.IPC_RMID, None)
+
+    def view(self, length):
+        return memoryview((ctypes.c_char * length).from_address(self.addr)).cast("B")
+
+    def close(self):
+        self._libc.shmdt(self.addr)
+
+def _png_chunk(tag, body):
+    return struct.pack(">I", len(body)) + tag + body + struct.pack(">I", zlib.crc32(tag + body) & 0xffffffff)
+
+def encode_png(width, height, pixels, lsb_first=True, level=1):
+    """RGB PNG from 32bpp ZPixmap pixels (BGRX when the server is LSBFirst)."""
+    r, g, b = (2, 1, 0) if lsb_first else (1, 2, 3)
+    rgb = bytearray(width * height * 3)
+    rgb[0::3] = pixels[r::4]
+    rgb[1::3] = pixels[g::4]
+    rgb[2::3] = pixels[b::4]
+    stride = width * 3
+    raw = b"".join(b"\0" + rgb[i:i + stride] for i in range(0, len(rgb), stride))
+    return (
+        b"\x89PNG\r\n\x1a\n"
+        + _png_chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0))
+        + _png_chunk(b"IDAT", zlib.compress(raw, level))
+        + _png_chunk(b"IEND", b"")
+    )
+
+def capture_png(conn, root, x, y, width, height, use_shm=True):
+    """Grabs a root-window region and returns it PNG-encoded."""
+    import xcffib.shm
+    from xcffib.xproto import ImageFormat
+    lsb_first = conn.get_setup().image_byte_order == 0
+    size = width * height * 4
+    if use_shm and conn.core.QueryExtension(len("MIT-SHM"), "MIT-SHM").reply().present:
+        shm_ext = conn(xcffib.shm.key)
+        shm = _SysVShm(size)
+        seg = conn.generate_id()
+        try:
+            shm_ext.Attach(seg, shm.shmid, False, is_checked=True).check()
+            shm.mark_removed()
+            reply = shm_ext.GetImage(root, x, y, width, height, 0xFFFFFFFF, ImageFormat.ZPixmap, seg, 0).reply()
+            if reply.depth not in (24, 32):
+                raise ValueError(f"unsupported depth {reply.depth}")
+            # encode straight out of the shared segment, no intermediate copy
+            return encode_png(width, height, shm.view(size), lsb_first)
+        finally:
+            shm_ext.Detach(seg)
+            conn.flush()
+            shm.close()
+    reply = conn.core.GetImage(ImageFormat.ZPixmap, root, x, y, width, height, 0xFFFFFFFF).reply()
+    return encode_png(width, height, reply.data.buf(), lsb_first)
+
+def select_region(conn, root):
+    """Rubber-band selection like scrot -s: drag for a region, click for the
+    window under the pointer, right-click to cancel. Returns (x, y, w, h)."""
+    from xcffib import xproto
+    cursor_font = conn.generate_id()
+    conn.core.OpenFont(cursor_font, len("cursor"), "cursor")
+    cursor = conn.generate_id()
+    conn.core.CreateGlyphCursor(cursor, cursor_font, cursor_font, 34, 35, 0, 0, 0, 0xFFFF, 0xFFFF, 0xFFFF)
+    mask = xproto.EventMask.ButtonPress | xproto.EventMask.ButtonRelease | xproto.EventMask.PointerMotion
+    for _ in range(20):
+        status = conn.core.GrabPointer(
+            False, root, mask, xproto.GrabMode.Async, xproto.GrabMode.Async,
+            0, cursor, xproto.Time.CurrentTime,
+        ).reply().status
+        if status == xproto.GrabStatus.Success:
+            break
+        time.sleep(0.05)
+    else:
+        raise RuntimeError("could not grab the pointer")
+    gc = conn.generate_id()
+    conn.core.CreateGC(
+        gc, root, xproto.GC.Function | xproto.GC.Foreground | xproto.GC.SubwindowMode,
+        [xproto.GX.xor, 0xFFFFFF, xproto.SubwindowMode.IncludeInferiors],
+    )
+
+    def rect(a, b):
+        return min(a[0], b[0]), min(a[1], b[1]), abs(a[0] - b[0]), abs(a[1] - b[1])
+
+    def draw(r):
+        # xor: drawing the same rectangle twice erases it
+        if r:
+            conn.core.PolyRectangle(root, gc, 1, [xproto.RECTANGLE.synthetic(*r)])
+            conn.flush()
+
+    start = shown = result = None
+    try:
+        while True:
+            event = conn.wait_for_event()
+            if isinstance(event, xproto.ButtonPressEvent):
+                if event.detail != 1:
+                    break
+                start = (event.root_x, event.root_y)
+            elif isinstance(event, xproto.MotionNotifyEvent) and start:
+                draw(shown)
+                shown = rect(start, (event.root_x, event.root_y))
+                draw(shown)
+            elif isinstance(event, xproto.ButtonReleaseEvent) and start:
+                draw(shown)
+                shown = None
+                result = rect(start, (event.root_x, event.root_y))
+                if result[2] < 3 and result[3] < 3 and event.child:
+                    geo = conn.core.GetGeometry(event.child).reply()
+                    result = (geo.x, geo.y, geo.width, geo.height)
+                break
+    finally:
+        draw(shown)
+        conn.core.UngrabPointer(xproto.Time.CurrentTime)
+        conn.core.FreeGC(gc)
+        conn.core.FreeCursor(cursor)
+        conn.core.CloseFont(cursor_font)
+        conn.flush()
+    if result and result[2] and result[3]:
+        return result
+    return None
+
+class ClipboardOwner:
+    """Serves the CLIPBOARD selection on its own X connection and thread, so
+    no xclip process has to stay around to own it; large payloads use INCR."""
+    INCR_CHUNK = 256 * 1024
+
+    def __init__(self, display=None):
+        import xcffib
+        from xcffib import xproto
+        self.xproto = xproto
+        self.conn = xcffib.connect(display=display or os.environ.get("DISPLAY"))
+        screen = self.conn.get_setup().roots[self.conn.pref_screen]
+        self.wid = self.conn.generate_id()
+        self.conn.core.CreateWindow(
+            0, self.wid, screen.root, -1, -1, 1, 1, 0,
+            xproto.WindowClass.InputOnly, screen.root_visual, 0, [],
+        )
+        self.atoms = {name: self._intern(name) for name in ("CLIPBOARD", "TARGETS", "INCR")}
+        self._lock = threading.Lock()
+        self._target = None
+        self._data = b""
+        self._transfers = {}  # (requestor, property) -> (type atom, remaining data)
+        threading.Thread(target=self._run, name="clipboard-owner", daemon=True).start()
+
+    def _intern(self, name):
+        return self.conn.core.InternAtom(False, len(name), name).reply().atom
+
+    def set(self, mime, data):
+        target = self._intern(mime)
+        with self._lock:
+            self._target, self._data = target, data
+        self.conn.core.SetSelectionOwner(self.wid, self.atoms["CLIPBOARD"], self.xproto.Time.CurrentTime)
+        self.conn.flush()
+
+    def _change_property(self, window, prop, type_, fmt, data):
+        # ChangeProperty by hand: xcffib's pack_list is far too slow for MBs of bytes
+        count = len(data) // (fmt // 8)
+        header = struct.pack("=xB2xIIIB3xI", self.xproto.PropMode.Replace, window, prop, type_, fmt, count)
+        self.conn.core.send_request(18, io.BytesIO(header + bytes(data)))
+
+    def _run(self):
+        xproto = self.xproto
+        while True:
+            try:
+                event = self.conn.wait_for_event()
+            except Exception:
+                logger.exception("clipboard owner: X connection lost")
+                return
+            if isinstance(event, xproto.SelectionRequestEvent):
+                self._on_request(event)
+            elif isinstance(event, xproto.PropertyNotifyEvent) and event.state == xproto.Property.Delete:
+                self._on_property_deleted(event.window, event.atom)
+            elif isinstance(event, xproto.SelectionClearEvent):
+                with self._lock:
+                    self._target, self._data = None, b""
+            self.conn.flush()
+
+    def _on_request(self, event):
+        xproto = self.xproto
+        prop = event.property or event.target  # pre-ICCCM clients send None
+        with self._lock:
+            target, data = self._target, self._data
+        if event.target == self.atoms["TARGETS"]:
+            targets = [self.atoms["TARGETS"]] + ([target] if target else [])
+            self._change_property(event.requestor, prop, xproto.Atom.ATOM, 32, struct.pack(f"={len(targets)}I", *targets))
+        elif target and event.target == target:
+            if len(data) > self.INCR_CHUNK:
+                self.conn.core.ChangeWindowAttributes(event.requestor, xproto.CW.EventMask, [xproto.EventMask.PropertyChange])
+                self._change_property(event.requestor, prop, self.atoms["INCR"], 32, struct.pack("=I", len(data)))
+                self._transfers[(event.requestor, prop)] = (target, memoryview(data))
+            else:
+                self._change_property(event.requestor, prop, target, 8, data)
+        else:
+            prop = xproto.Atom._None
+        notify = xproto.SelectionNotifyEvent.synthetic(event.time, event.requestor, event.selection, event.target, prop)
+        self.conn.core.SendEvent(False, event.requestor, xproto.EventMask.NoEvent, notify.pack())
+
+    def _on_property_deleted(self, window, prop):
+        transfer = self._transfers.get((window, prop))
+        if transfer is None:
+            return
+        target, remaining = transfer
+        chunk = remaining[:self.INCR_CHUNK]
+        # the final, empty chunk tells the requestor we are done
+        self._change_property(window, prop, target, 8, chunk)
+        if chunk:
+            self._transfers[(window, prop)] = (target, remaining[self.INCR_CHUNK:])
+        else:
+            del self._transfers[(window, prop)]
+            self.conn.core.ChangeWindowAttributes(window, self.xproto.CW.EventMask, [0])
+
+def get_clipboard_owner():
+    """The process's ClipboardOwner, created on first use and kept across reloads."""
+    global clipboard_owner
+    if globals().get('clipboard_owner') is None:
+        clipboard_owner = ClipboardOwner()
+    return clipboard_owner
+
+def region_to_clipboard(on_error):
+    """Lets the user select a region and puts it on the clipboard as a PNG,
+    on a thread with its own X connection; on_error(exception) runs on that
+    thread if any step fails."""
+    def work():
+        import xcffib
+        conn = None
+        try:
+            conn = xcffib.connect(display=os.environ.get("DISPLAY"))
+            root = conn.get_setup().roots[conn.pref_screen].root
+            region = select_region(conn, root)
+            if region is None:
+                return
+            start = time.perf_counter()
+            png = capture_png(conn, root, *region)
+            get_clipboard_owner().set("image/png", png)
+            logger.info(f"screenshot {region[2]}x{region[3]}: {len(png)} bytes on clipboard in {(time.perf_counter() - start) * 1000:.1f} ms")
+        except Exception as e:
+            on_error(e)
+        finally:
+            if conn is not None:
+                conn.disconnect()
+    threading.Thread(target=work, name="screenshot", daemon=True).start()
@@ -0,0 +1,75 @@
+# A few terminals started ahead and parked in a hidden ScratchPad group, so
+# opening one only moves it onto the current group. Its size follows the power
+# mode; key-press-to-shown latency is logged for pooled and cold launches.
+
+import logging
+import statistics
+import time
+
+logger = logging.getLogger(__name__)
+
+POOL_GROUP = "termpool"
+POOL_SIZE = {"ac": 2, "battery": 1, "low_battery": 0, "idle": 0}
+POOL_SPAWN_TIMEOUT = 10  # seconds before a prelaunch is given up on
+
+class TerminalPool:
+    def __init__(self, power, has_tool):
+        self.power = power  # its mode sets the pool size
+        self.has_tool = has_tool
+        self.terminal = None  # the config sets these two on every load
+        self.enabled = False
+        self._prelaunching = {}  # pid -> spawn time
+        self._cold = {}          # pid -> key press time
+        self.latency = {"pool": [], "cold": []}
+
+    def target_size(self):
+        if not self.enabled:
+            return 0
+        return POOL_SIZE.get(self.power.mode or "ac", 0)
+
+    def refill(self, qtile_instance):
+        group = qtile_instance.groups_map.get(POOL_GROUP)
+        if group is None:
+            return
+        now = time.monotonic()
+        self._prelaunching = {pid: t for pid, t in self._prelaunching.items()
+                              if now - t < POOL_SPAWN_TIMEOUT}
+        want = self.target_size()
+        for win in list(group.windows)[want:]:
+            win.kill()
+        if want > len(group.windows) and not self.has_tool(self.terminal):
+            return
+        for _ in range(want - len(group.windows) - len(self._prelaunching)):
+            pid = qtile_instance.cmd_spawn(self.terminal)
+            if pid <= 0:
+                logger.warning(f"terminal pool: cannot start {self.terminal}")
+                return
+            self._prelaunching[pid] = now
+
+    def on_client_new(self, win):
+        # park prelaunched terminals before they are ever placed on a screen
+        if self._prelaunching.pop(win.get_pid(), None) is not None:
+            win.togroup(POOL_GROUP)
+
+    def on_client_managed(self, win):
+        start = self._cold.pop(win.get_pid(), None)
+        if start is not None:
+            self._record("cold", start)
+
+    def claim(self, qtile_instance):
+        start = time.monotonic()
+        group = qtile_instance.groups_map.get(POOL_GROUP)
+        if group is not None and group.windows:
+            group.windows[0].togroup(qtile_instance.current_group.name)
+            qtile_instance.core.flush()
+            self._record("pool", start)
+        else:
+            pid = qtile_instance.cmd_spawn(self.terminal)
+            if pid > 0:
+                self._cold[pid] = start
+        qtile_instance.call_later(1, self.refill, qtile_instance)
+
+    def _record(self, kind, start):
+        samples = self.latency[kind]
+        samples.append((time.monotonic() - start) * 1000)
+        logger.info(f"terminal ({kind}): shown in {samples[-1]:.1f} ms (median {statistics.median(samples):.1f} ms over {len(samples)})")
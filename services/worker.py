@@ -0,0 +1,145 @@
+# run_blocking() for the config's one-shot jobs. With QTILE_SINGLE_WORKER=1
+# they, every ThreadPoolText poll and run_in_executor() call share one thread,
+# and memory_report() (MOD+ctrl+shift+m) shows the RSS change per job.
+
+import asyncio
+import itertools
+import json
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from libqtile.widget import base
+
+logger = logging.getLogger(__name__)
+
+CACHE_DIR = os.path.expanduser('~/.cache/qtile')
+SINGLE_WORKER = os.environ.get("QTILE_SINGLE_WORKER", "") not in ("", "0")
+SHARED_WORKER_MAX_PENDING = 32  # run_blocking() jobs beyond this are dropped
+MEMORY_REPORT_FILE = os.path.join(CACHE_DIR, 'memory-report.json')
+PAGE_SIZE = os.sysconf("SC_PAGE_SIZE")
+
+def read_rss():
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * PAGE_SIZE
+
+def job_label(fn):
+    owner = getattr(fn, "__self__", None)
+    if isinstance(owner, base._Widget):
+        return f"widget:{owner.name}"
+    return getattr(fn, "__qualname__", repr(fn))
+
+def _log_job_error(future):
+    if not future.cancelled() and future.exception() is not None:
+        logger.error("background job failed", exc_info=future.exception())
+
+class SharedWorker(ThreadPoolExecutor):
+    """A one-thread executor that keeps what is queued and, per job label,
+    runs, run time and the RSS change across each run."""
+
+    def __init__(self, max_pending=SHARED_WORKER_MAX_PENDING):
+        super().__init__(max_workers=1, thread_name_prefix="qtile-worker")
+        self.max_pending = max_pending
+        self.dropped = 0
+        self._lock = threading.Lock()
+        self._ids = itertools.count()
+        self._pending = {}  # job id -> (label, queued at)
+        self._stats = {}    # label -> {"runs", "seconds", "rss_delta", "rss_max_delta"}
+
+    def submit(self, fn, /, *args, **kwargs):
+        job = next(self._ids)
+        label = job_label(fn)
+        with self._lock:
+            self._pending[job] = (label, time.monotonic())
+        future = super().submit(self._run, job, label, fn, args, kwargs)
+        future.add_done_callback(lambda _f: self._forget(job))
+        return future
+
+    def try_submit(self, fn, *args):
+        """submit(), unless max_pending jobs are already queued."""
+        with self._lock:
+            full = len(self._pending) >= self.max_pending
+            self.dropped += full
+        if full:
+            logger.warning(f"shared worker: {self.max_pending} jobs queued, dropped {job_label(fn)}")
+            return None
+        future = self.submit(fn, *args)
+        future.add_done_callback(_log_job_error)
+        return future
+
+    def _forget(self, job):
+        with self._lock:
+            self._pending.pop(job, None)
+
+    def _run(self, job, label, fn, args, kwargs):
+        self._forget(job)
+        rss = read_rss()
+        start = time.perf_counter()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            elapsed = time.perf_counter() - start
+            delta = read_rss() - rss
+            with self._lock:
+                stats = self._stats.setdefault(label, {"runs": 0, "seconds": 0.0, "rss_delta": 0, "rss_max_delta": 0})
+                stats["runs"] += 1
+                stats["seconds"] += elapsed
+                stats["rss_delta"] += delta
+                stats["rss_max_delta"] = max(stats["rss_max_delta"], delta)
+
+    def snapshot(self):
+        """Returns (pending jobs oldest first, stats per label)."""
+        now = time.monotonic()
+        with self._lock:
+            pending = [{"job": label, "queued_s": round(now - queued, 3)}
+                       for label, queued in self._pending.values()]
+            stats = {label: dict(s) for label, s in self._stats.items()}
+        return pending, stats
+
+# kept across config reloads, like the event loop's default executor it becomes
+if globals().get('shared_worker') is None:
+    shared_worker = SharedWorker() if SINGLE_WORKER else None
+    if shared_worker is not None:
+        try:
+            asyncio.get_running_loop().set_default_executor(shared_worker)
+        except RuntimeError:
+            pass  # no event loop (e.g. `qtile check`)
+
+def run_blocking(fn, *args, name=None):
+    """Runs fn(*args) off the event loop: on the shared worker in
+    single-worker mode, else on a thread of its own."""
+    if shared_worker is not None:
+        shared_worker.try_submit(fn, *args)
+    else:
+        threading.Thread(target=fn, args=args, name=name, daemon=True).start()
+
+def memory_report(qtile_instance=None):
+    status = {}
+    with open("/proc/self/status") as f:
+        for line in f:
+            key, _, value = line.partition(":")
+            status[key] = value.strip()
+    report = {
+        "rss": read_rss(),
+        "threads": int(status.get("Threads", 0)),
+        "python_threads": sorted(t.name for t in threading.enumerate()),
+        "single_worker": shared_worker is not None,
+    }
+    if shared_worker is not None:
+        pending, stats = shared_worker.snapshot()
+        report["widgets"] = {k[len("widget:"):]: v for k, v in stats.items() if k.startswith("widget:")}
+        report["jobs"] = {k: v for k, v in stats.items() if not k.startswith("widget:")}
+        report["pending"] = pending
+        report["dropped"] = shared_worker.dropped
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    with open(MEMORY_REPORT_FILE, 'w') as f:
+        json.dump(report, f, indent=1)
+    summary = f"RSS {report['rss'] / 2**20:.1f} MiB, {report['threads']} threads"
+    if shared_worker is not None:
+        top = sorted(stats.items(), key=lambda kv: kv[1]["rss_delta"], reverse=True)[:5]
+        summary += f", {len(pending)} queued; top RSS growth: " + ", ".join(
+            f"{label} {s['rss_delta'] / 1024:+.0f} KiB/{s['runs']} runs" for label, s in top)
+    logger.info(f"memory report ({MEMORY_REPORT_FILE}): {summary}")
+    return report
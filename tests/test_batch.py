@@ -0,0 +1,78 @@
+# services.batch: deferred_layout's patching of Group.layout_all and which
+# windows a batch op may pick, against stand-in groups and windows.
+
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("libqtile.config")
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from services import batch  # noqa: E402
+
+
+class FakeGroup:
+    def __init__(self, name, on_screen=True):
+        self.name = name
+        self.screen = object() if on_screen else None
+        self.layouts_run = 0
+
+    def layout_all(self, warp=False):
+        self.layouts_run += 1
+
+
+class FakeWindow:
+    def __init__(self, wid, group):
+        self.wid = wid
+        self.group = group
+
+
+@pytest.fixture
+def groups():
+    return [FakeGroup("1"), FakeGroup("2"), FakeGroup("3", on_screen=False)]
+
+
+@pytest.fixture
+def qtile_instance(groups):
+    return SimpleNamespace(groups=groups, windows_map={}, current_window=None)
+
+
+def test_layout_once_per_dirty_group(qtile_instance, groups):
+    with batch.deferred_layout(qtile_instance):
+        for _ in range(3):
+            groups[0].layout_all()
+        groups[2].layout_all()
+    assert [g.layouts_run for g in groups] == [1, 0, 0]
+    assert all("layout_all" not in vars(g) for g in groups)
+
+
+def test_restored_when_the_block_raises(qtile_instance, groups):
+    with pytest.raises(RuntimeError):
+        with batch.deferred_layout(qtile_instance):
+            groups[1].layout_all()
+            raise RuntimeError("op failed")
+    assert [g.layouts_run for g in groups] == [0, 1, 0]
+    assert all("layout_all" not in vars(g) for g in groups)
+
+
+def test_nested_blocks_lay_out_on_the_outer_exit(qtile_instance, groups):
+    with batch.deferred_layout(qtile_instance) as outer:
+        with batch.deferred_layout(qtile_instance):
+            groups[0].layout_all()
+        assert groups[0].layouts_run == 0
+        assert outer == [groups[0]]
+        assert "layout_all" in vars(groups[0])
+    assert groups[0].layouts_run == 1
+    assert all("layout_all" not in vars(g) for g in groups)
+
+
+def test_focused_window_must_be_a_user_window(qtile_instance, groups, monkeypatch):
+    monkeypatch.setattr(batch, "qtile", SimpleNamespace(config=SimpleNamespace(groups=[])))
+    pooled = FakeWindow(1, FakeGroup(batch.POOL_GROUP, on_screen=False))
+    qtile_instance.current_window = pooled
+    assert batch._batch_windows(qtile_instance, "focused") == []
+    normal = FakeWindow(2, groups[0])
+    qtile_instance.current_window = normal
+    assert batch._batch_windows(qtile_instance, "focused") == [normal]
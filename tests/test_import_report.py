@@ -0,0 +1,65 @@
+# config-import-report: parsing -X importtime output and the --check exit
+# status, with run_once replaced by canned runs.
+
+import importlib.machinery
+import importlib.util
+import json
+from pathlib import Path
+
+import pytest
+
+SCRIPT = Path(__file__).resolve().parents[1] / "config-import-report"
+
+SAMPLE = """\
+import time: self [us] | cumulative | imported package
+import time:       263 |        263 |       _json
+import time:       600 |        863 |     json.scanner
+import time:       569 |       1432 |   json.decoder
+import time:       339 |       1771 | json
+import time:      4000 |       4000 |   libqtile.widget
+import time:      2500 |       6500 | libqtile
+import time:      1200 |       9471 | laptop-config
+import time:        50 |         50 | after_the_config
+"""
+
+
+@pytest.fixture
+def report(tmp_path, monkeypatch):
+    loader = importlib.machinery.SourceFileLoader("config_import_report", str(SCRIPT))
+    spec = importlib.util.spec_from_loader(loader.name, loader)
+    module = importlib.util.module_from_spec(spec)
+    loader.exec_module(module)
+    monkeypatch.setattr(module, "BUDGET_FILE", str(tmp_path / "import-budget.json"))
+    monkeypatch.setattr(module, "run_once", lambda path: module.parse_importtime(SAMPLE, "laptop-config"))
+    return module
+
+
+def write_budget(report, ms):
+    with open(report.BUDGET_FILE, "w") as f:
+        json.dump({"laptop-config.py": ms}, f)
+
+
+def test_parse_stops_at_the_config(report):
+    rows = report.parse_importtime(SAMPLE, "laptop-config")
+    assert rows[0] == ("_json", 263, 263, 3)
+    assert rows[-1] == ("laptop-config", 1200, 9471, 0)
+    assert report.by_package(rows) == [("libqtile", 6500), ("json", 1508), ("_json", 263)]
+    assert report.parse_importtime(SAMPLE, "config") is None
+
+
+@pytest.mark.parametrize("budget, status", [(9.0, 1), (10.0, 0)])
+def test_check_fails_only_over_budget(report, capsys, budget, status):
+    write_budget(report, budget)
+    assert report.main(["laptop-config.py", "--runs", "1", "--check"]) == status
+    assert ("OVER" in capsys.readouterr().out) == bool(status)
+
+
+def test_check_without_a_budget_skips(report, capsys):
+    assert report.main(["laptop-config.py", "--runs", "1", "--check"]) == 0
+    assert "skipping the check" in capsys.readouterr().out
+
+
+def test_update_budget_adds_the_margin(report):
+    assert report.main(["laptop-config.py", "--runs", "1", "--update-budget"]) == 0
+    with open(report.BUDGET_FILE) as f:
+        assert json.load(f) == {"laptop-config.py": round(9.471 * report.BUDGET_MARGIN, 1)}
@@ -0,0 +1,160 @@
+# notifications.Notifier against a stub org.freedesktop.Notifications on a
+# private dbus-daemon, so nothing reaches the desktop's notification daemon.
+
+import asyncio
+import importlib
+import shutil
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+pytest.importorskip("libqtile")
+if shutil.which("dbus-daemon") is None:
+    pytest.skip("dbus-daemon is not installed", allow_module_level=True)
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+import dbus_compat  # noqa: E402
+import notifications  # noqa: E402
+
+
+def stub_notifications(dbus):
+    """A stub org.freedesktop.Notifications built on the given library."""
+    service = importlib.import_module(dbus.__name__ + ".service")
+
+    class StubNotifications(service.ServiceInterface):
+        def __init__(self):
+            super().__init__("org.freedesktop.Notifications")
+            self.calls = []  # (replaces_id, summary, body)
+            self._last_id = 0
+
+        @service.method()
+        def Notify(self, app_name: "s", replaces_id: "u", app_icon: "s", summary: "s", body: "s",  # noqa: F821
+                   actions: "as", hints: "a{sv}", expire_timeout: "i") -> "u":  # noqa: F821
+            self.calls.append((replaces_id, summary, body))
+            if replaces_id:
+                return replaces_id
+            self._last_id += 1
+            return self._last_id
+
+    return StubNotifications()
+
+
+class FakeQtile:
+    """The bits of libqtile.qtile the Notifier uses, on the running loop."""
+
+    def __init__(self, loop):
+        self.loop = loop
+        self.widgets_map = {}
+
+    def call_soon_threadsafe(self, fn, *args):
+        return self.loop.call_soon_threadsafe(fn, *args)
+
+    def call_later(self, delay, fn, *args):
+        return self.loop.call_later(delay, fn, *args)
+
+
+class FallbackWidget:
+    def __init__(self):
+        self.texts = []
+
+    def update(self, text):
+        self.texts.append(text)
+
+
+@pytest.fixture(params=dbus_compat.DBUS_LIBRARIES)
+def dbus(request, monkeypatch):
+    """Each D-Bus library qtile may use, as the one Notifier picks."""
+    library = pytest.importorskip(request.param)
+    importlib.import_module(request.param + ".aio")
+    monkeypatch.setattr(dbus_compat, "_library", library)
+    return library
+
+
+@pytest.fixture
+def bus_address(dbus):
+    daemon = subprocess.Popen(["dbus-daemon", "--session", "--nofork", "--print-address"],
+                              stdout=subprocess.PIPE, text=True)
+    try:
+        yield daemon.stdout.readline().strip()
+    finally:
+        daemon.terminate()
+        daemon.wait(5)
+
+
+def run(coro_fn):
+    async def main():
+        fake = FakeQtile(asyncio.get_running_loop())
+        saved, notifications.qtile = notifications.qtile, fake
+        try:
+            return await coro_fn(fake)
+        finally:
+            notifications.qtile = saved
+    return asyncio.run(main())
+
+
+async def serve_stub(dbus, address):
+    bus = await dbus.aio.MessageBus(bus_address=address).connect()
+    stub = stub_notifications(dbus)
+    bus.export("/org/freedesktop/Notifications", stub)
+    await bus.request_name("org.freedesktop.Notifications")
+    return bus, stub
+
+
+async def wait_until(predicate, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        assert time.monotonic() < deadline, "timed out"
+        await asyncio.sleep(0.01)
+
+
+def test_tag_reuses_its_notification_id(dbus, bus_address):
+    async def scenario(fake):
+        bus, stub = await serve_stub(dbus, bus_address)
+        notifier = notifications.Notifier(bus_address=bus_address)
+        notifier.notify("Gaps", "on", tag="gaps")
+        notifier.notify("Gaps", "off", tag="gaps")
+        notifier.notify("Bluetooth", "powered", tag="bluetooth")
+        notifier.notify("Gaps", "on", tag="gaps")
+        await wait_until(lambda: len(stub.calls) == 4)
+        bus.disconnect()
+        return stub.calls
+
+    calls = run(scenario)
+    assert calls == [(0, "Gaps", "on"), (1, "Gaps", "off"), (0, "Bluetooth", "powered"), (1, "Gaps", "on")]
+
+
+def test_rate_limit_holds_back_the_latest_tagged_and_drops_untagged(dbus, bus_address):
+    async def scenario(fake):
+        bus, stub = await serve_stub(dbus, bus_address)
+        notifier = notifications.Notifier(bus_address=bus_address, burst=2, interval=0.5)
+        for i in range(5):
+            notifier.notify("Volume", f"{i * 10}%", tag="volume")
+            notifier.notify("Untagged", str(i))
+        await wait_until(lambda: len(stub.calls) == 4)
+        await asyncio.sleep(0.2)
+        within_interval = list(stub.calls)
+        await wait_until(lambda: len(stub.calls) == 5, timeout=2)
+        await asyncio.sleep(0.7)
+        bus.disconnect()
+        return within_interval, stub.calls, notifier.dropped
+
+    within_interval, calls, dropped = run(scenario)
+    assert sorted(c[1:] for c in within_interval) == sorted(
+        [("Volume", "0%"), ("Volume", "10%"), ("Untagged", "0"), ("Untagged", "1")])
+    assert calls[4] == (1, "Volume", "40%")  # only the latest, replacing the earlier ones
+    assert len(calls) == 5
+    assert dropped == 3
+
+
+def test_falls_back_to_the_bar_without_a_daemon(bus_address):
+    async def scenario(fake):
+        widget = fake.widgets_map[notifications.NOTIFY_FALLBACK_WIDGET] = FallbackWidget()
+        notifier = notifications.Notifier(bus_address=bus_address)
+        notifier.notify("Launcher", "rofi is not installed", tag="launcher")
+        await wait_until(lambda: widget.texts)
+        return widget.texts
+
+    assert run(scenario) == ["Launcher: rofi is not installed"]